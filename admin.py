@@ -4,8 +4,28 @@ import math
 import json
 import time
 import os
+import argparse
+import heapq
+from collections import deque
+import numpy as np
 
 from pygame.constants import FULLSCREEN
+from spatial import SpatialGrid
+from profiler import FrameProfiler, CsvSink
+from walkability import WalkGrid, load_map_asset
+from roads import RoadGraph, WAYPOINT_STEP
+from fields import MapFields, CLEARANCE, slide
+from render import WorldRenderer
+from heat import HeatField
+from effects import PulsePool, NotificationQueue, AlphaFrames
+from text import render_text
+from stream import StateStreamServer, STREAM_PORT, STREAM_HOST
+from journal import EventJournal, JournalReader, journal_dir_for
+from snapshot import save_state
+from personnel import PersonnelDirectory
+from search import SearchIndex, PAGE_SIZE
+from interventions import InterventionQueue, INTERVENTION_RADIUS
+from population import PopulationStats, SAMPLE_TICKS, TRUST_BINS
 
 # --- SETTINGS ---
 WIDTH, HEIGHT = 1600, 1100
@@ -14,6 +34,11 @@ MAP_AREA = WIDTH - UI_WIDTH
 FPS = 60
 AGENT_COUNT = 60
 EYE_FADE_TIME = 2.0 
+NOTIFICATION_TIME = 3.0
+SYNC_INTERVAL = 120  # Ticks between state broadcasts (2 s at 60 FPS)
+STATE_FILE = "aegis_state.bin"  # Any .json path writes the readable debug format instead
+RECENT_EVENTS = 15   # Events repeated in each state snapshot; the journal keeps them all
+PROFILE_PHASES = ("events", "camera", "agents", "draw_world", "hud", "sidebar", "notifications", "sync", "present")
 
 # Surveillance Aesthetic Colors
 COLOR_BG = (2, 4, 8)
@@ -26,6 +51,12 @@ COLOR_TRUST = (0, 150, 255)
 # Pedestrian Settings
 MINSPEED = .6
 MAXSPEED = 1.5
+AGENT_RADIUS = 5
+GRID_CELL = 2 * AGENT_RADIUS  # One cell spans a full contact distance
+COMMUTER_SHARE = 0.7  # Agents travelling between destinations on the road graph
+ROUTE_SLACK = 3 * WAYPOINT_STEP  # Further than this from the next waypoint = off route
+REPLAN_TICKS = 30  # A commuter re-plans its route at most this often
+RESUME_REACH = 2 * ROUTE_SLACK  # A commuter back on a road picks its route up again if within this
 
 # --- SENTIENT PHRASES ---
 GTA_PHRASES = [
@@ -36,6 +67,12 @@ GTA_PHRASES = [
     "Stuck in a 1-star chase.", "Watching Weazel News."
 ]
 
+# kind -> (event type, event message, log line, pulse colour)
+INTERVENTION_STYLE = {
+    "misinfo": ("MISINFO", "RIOT SEEDED", "MISINFO SPIKE DETECTED", COLOR_DANGER),
+    "counter": ("COUNTER", "TRUTH SYNCED", "COUNTER-NARRATIVE DEPLOYED", COLOR_ACCENT),
+}
+
 RIOT_PHRASES = [
     "Authority is a lie!", "The system is rigged!",
     "WAKE UP PEOPLE!", "Stop cooperating!",
@@ -45,39 +82,6 @@ RIOT_PHRASES = [
 def clamp(val, min_v, max_v):
     return max(min_v, min(max_v, int(val)))
 
-# --- NOTIFICATION SYSTEM ---
-class Notification:
-    def __init__(self, text, duration=3.0):
-        self.text = text
-        self.duration = duration * FPS
-        self.timer = self.duration
-        self.alpha = 255
-
-    def update(self):
-        self.timer -= 1
-        self.alpha = clamp((self.timer / self.duration) * 255, 0, 255)
-        return self.timer > 0
-
-# --- PRETTY PULSE SYSTEM ---
-class Pulse:
-    def __init__(self, x, y, color, max_radius=30):
-        self.x, self.y = x, y
-        self.color = color
-        self.radius = 2
-        self.max_radius = max_radius
-        self.alpha = 255
-
-    def update(self):
-        self.radius += 2.5
-        self.alpha -= 10  
-        return self.alpha > 0
-
-    def draw(self, surface):
-        if self.alpha > 0:
-            s = pygame.Surface((int(self.radius*2), int(self.radius*2)), pygame.SRCALPHA)
-            pygame.draw.circle(s, (*self.color, self.alpha), (int(self.radius), int(self.radius)), int(self.radius), 2)
-            surface.blit(s, (int(self.x - self.radius), int(self.y - self.radius)))
-
 # --- CAMERA ---
 class Camera:
     def __init__(self):
@@ -100,182 +104,516 @@ class Camera:
         self.x = max(0, min(self.x, MAP_AREA - MAP_AREA/self.zoom))
         self.y = max(0, min(self.y, HEIGHT - HEIGHT/self.zoom))
 
+    def view_rect(self):
+        return pygame.Rect(self.x, self.y, MAP_AREA/self.zoom, HEIGHT/self.zoom)
+
 class MapHandler:
-    def __init__(self):
+    def __init__(self, convert=True):
+        self.convert = convert
         self.surface = pygame.Surface((MAP_AREA, HEIGHT))
+        self.source = None
         self.load_map()
-        self.mask = pygame.mask.from_threshold(self.surface, COLOR_WHITE, (10, 10, 10))
+        self.roads = RoadGraph.load_or_build(self.walk, self.source, (MAP_AREA, HEIGHT))
+        self.road_cells = self.roads.mask(self.walk.cells.shape)    # Where the road flow field ends
+        self.fields = MapFields.load_or_build(self.walk, self.source, (MAP_AREA, HEIGHT), {"road": self.road_cells})
 
     def load_map(self):
         if os.path.exists("anothermap.png"):
-            img = pygame.image.load("anothermap.png").convert()
-            self.surface = pygame.transform.scale(img, (MAP_AREA, HEIGHT))
+            self.source = "anothermap.png"
+            self.surface, self.walk = load_map_asset(self.source, (MAP_AREA, HEIGHT))
+            if self.convert: self.surface = self.surface.convert()
         else:
             self.surface.fill((10, 10, 12))
             for i in range(0, MAP_AREA, 180): pygame.draw.rect(self.surface, COLOR_WHITE, (i, 0, 40, HEIGHT))
             for i in range(0, HEIGHT, 180): pygame.draw.rect(self.surface, COLOR_WHITE, (0, i, MAP_AREA, 40))
-
-class Agent:
-    def __init__(self, id, mh):
-        self.id, self.mh = id, mh
-        self.has_app = random.random() < 0.6
-        self.trust_level = random.uniform(0.3, 0.7) 
-        self.hostility = 0.5
-        self.radius = 5
-        self.x, self.y = 0.0, 0.0
-        self.spawn()
-        self.angle = random.choice([0, 90, 180, 270])
-        self.speed = random.uniform(MINSPEED, MAXSPEED)
-        self.state = "WALKING"
-        self.timer = 0
-        self.activity = random.choice(GTA_PHRASES)
-        self.username = ""
-        self.role = ""
-
-    def spawn(self):
-        for _ in range(1000):
-            rx, ry = random.randint(10, MAP_AREA-10), random.randint(10, HEIGHT-10)
-            if self.mh.mask.get_at((rx, ry)): self.x, self.y = float(rx), float(ry); return
-        self.x, self.y = 100.0, 100.0
-
-    def update(self, is_controlled, agents, pulses):
-        self.hostility = 1.0 - self.trust_level
-        old_x, old_y = self.x, self.y
-        if is_controlled:
-            keys = pygame.key.get_pressed()
-            dx = (keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]) * self.speed
-            dy = (keys[pygame.K_DOWN] - keys[pygame.K_UP]) * self.speed
-            self.x += dx; self.y += dy
+            self.walk = WalkGrid.from_surface(self.surface)
+
+# --- AGENT STORE ---
+# Agent state lives in parallel arrays so a whole tick is a handful of
+# NumPy operations instead of one Python method call per agent.
+IDLE, WALKING = 0, 1
+STATE_NAMES = ("IDLE", "WALKING")
+HEADINGS = np.array([0.0, 90.0, 180.0, 270.0])
+
+class AgentStore:
+    def __init__(self, count, mh, rng=None):
+        self.count, self.mh = count, mh
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.has_app = self.rng.random(count) < 0.6
+        self.trust_level = self.rng.uniform(0.3, 0.7, count)
+        self.stats = PopulationStats(self.trust_level, self.has_app)    # Told about every trust change
+        self.hostility = np.full(count, 0.5)
+        self.x, self.y = self.spawn_points(count)
+        self.angle = self.rng.choice(HEADINGS, count)
+        self.speed = self.rng.uniform(MINSPEED, MAXSPEED, count)
+        self.state = np.full(count, WALKING, dtype=np.int8)
+        self.timer = np.zeros(count, dtype=np.int32)
+        self.activity = [random.choice(GTA_PHRASES) for _ in range(count)]
+        self.username = [""] * count
+        self.role = [""] * count
+        self.commuter = self.rng.random(count) < COMMUTER_SHARE
+        self.routes = [None] * count
+        self.route_pos = np.zeros(count, dtype=np.int32)
+        self.dest = np.full(count, -1, dtype=np.int32)
+        self.replan_at = np.zeros(count, dtype=np.int64)    # Tick before which rejoin() is refused
+        self.ticks = 0
+        self.goal_x, self.goal_y = self.x.copy(), self.y.copy()
+        self.place_commuters()
+        self.grid = SpatialGrid(GRID_CELL, MAP_AREA, HEIGHT)
+        self.grid.rebuild(self.x, self.y)
+
+    def place_commuters(self):
+        # Commuters start on a road point and head for a random destination
+        roads = self.mh.roads
+        if not len(roads.poly):
+            self.commuter[:] = False
+            return
+        idx = np.flatnonzero(self.commuter)
+        picks = self.rng.integers(len(roads.poly), size=len(idx))
+        self.x[idx], self.y[idx] = roads.poly[picks, 0], roads.poly[picks, 1]
+        for i, k in zip(idx.tolist(), picks.tolist()):
+            start = int(roads.edge_uv[roads.point_edge[k], 0])
+            dest = roads.random_destination(start, self.rng)
+            self.set_route(i, roads.route_from_point(k, dest), dest)
+
+    def set_route(self, i, route, dest):
+        self.routes[i] = route
+        self.route_pos[i] = 0
+        self.dest[i] = dest
+        self.goal_x[i], self.goal_y[i] = route[0]
+
+    def rejoin(self, i):
+        # Back on the road: carry on towards the same destination from here.
+        # Rate limited, so a commuter wedged in a crowd doesn't re-plan every tick
+        if self.ticks < self.replan_at[i]: return
+        self.replan_at[i] = self.ticks + REPLAN_TICKS
+        roads = self.mh.roads
+        k = roads.nearest_point(self.x[i], self.y[i])
+        self.set_route(i, roads.route_from_point(k, int(self.dest[i])), int(self.dest[i]))
+
+    def resume(self, i):
+        # Back on a road after a shove: head for the nearest waypoint still
+        # ahead on the current route. Only a route that is nowhere near gets
+        # re-planned.
+        pos = int(self.route_pos[i])
+        ahead = self.routes[i][pos:]
+        d = np.hypot(ahead[:, 0] - self.x[i], ahead[:, 1] - self.y[i])
+        k = int(np.argmin(d))
+        if d[k] > RESUME_REACH: return self.rejoin(i)
+        self.route_pos[i] = pos + k
+        self.goal_x[i], self.goal_y[i] = ahead[k]
+        self.angle[i] = math.degrees(math.atan2(ahead[k, 1] - self.y[i], ahead[k, 0] - self.x[i]))
+
+    def advance_route(self, i):
+        pos = self.route_pos[i] + 1
+        route = self.routes[i]
+        if pos < len(route):
+            self.route_pos[i] = pos
+            self.goal_x[i], self.goal_y[i] = route[pos]
         else:
-            if self.state == "IDLE":
-                self.timer -= 1
-                if self.timer <= 0: 
-                    self.state = "WALKING"; self.angle = random.choice([0, 90, 180, 270])
-                    if self.trust_level > 0.4: self.activity = random.choice(GTA_PHRASES)
-            else:
-                if random.random() < 0.005: 
-                    self.state = "IDLE"; self.timer = 60
-                rad = math.radians(self.angle)
-                self.x += math.cos(rad) * self.speed; self.y += math.sin(rad) * self.speed
-
-        if not (0 <= self.x < MAP_AREA and 0 <= self.y < HEIGHT) or not self.mh.mask.get_at((int(self.x), int(self.y))):
-            self.x, self.y = old_x, old_y; self.angle = random.choice([0, 90, 180, 270])
-
-        for other in agents:
-            if other == self: continue
-            dist = math.hypot(self.x - other.x, self.y - other.y)
-            if dist < self.radius + other.radius:
-                if self.trust_level < 0.3 and other.trust_level > 0.3:
-                    other.trust_level -= 0.05 
-                elif self.trust_level > 0.8 and other.trust_level < 0.8:
-                    other.trust_level += 0.05 
-                
-                overlap = (self.radius + other.radius) - dist
-                ang = math.atan2(self.y - other.y, self.x - other.x)
-                self.x += math.cos(ang) * overlap; self.y += math.sin(ang) * overlap
-                return other
-        return None
+            # Arrived: pick the next destination from here
+            roads = self.mh.roads
+            here = int(self.dest[i])
+            dest = roads.random_destination(here, self.rng)
+            self.set_route(i, roads.route(here, dest), dest)
+
+    def spawn_points(self, count):
+        x, y = np.full(count, 100.0), np.full(count, 100.0)
+        pending = np.arange(count)
+        for _ in range(1000):
+            if not len(pending): break
+            rx = self.rng.integers(10, MAP_AREA - 10, len(pending), endpoint=True)
+            ry = self.rng.integers(10, HEIGHT - 10, len(pending), endpoint=True)
+            ok = self.mh.walk.cells[ry, rx]
+            x[pending[ok]], y[pending[ok]] = rx[ok], ry[ok]
+            pending = pending[~ok]
+        return x, y
+
+    def tick(self, controlled=None, control=(0, 0)):
+        n, rng, fields = self.count, self.rng, self.mh.fields
+        self.ticks += 1
+        self.hostility[:] = 1.0 - self.trust_level
+
+        free = np.ones(n, dtype=bool)
+        if controlled is not None: free[controlled] = False
+        idle = free & (self.state == IDLE)
+        walking = free & ~idle
+
+        self.timer[idle] -= 1
+        woke = idle & (self.timer <= 0)
+        self.state[woke] = WALKING
+        self.angle[woke] = rng.choice(HEADINGS, np.count_nonzero(woke))
+        for i in np.flatnonzero(woke & (self.trust_level > 0.4)):
+            self.activity[i] = random.choice(GTA_PHRASES)
+
+        rest = walking & (rng.random(n) < 0.005)
+        self.state[rest] = IDLE; self.timer[rest] = 60
+
+        # Commuters steer straight at their next waypoint. One shoved off its
+        # route follows the road flow field back; once on a road cell (where
+        # the flow ends) it picks its route up again, and only one stuck off
+        # the road with no flow to follow plans a new route
+        steer = walking & self.commuter
+        to_x, to_y = self.goal_x[steer] - self.x[steer], self.goal_y[steer] - self.y[steer]
+        self.angle[steer] = np.degrees(np.arctan2(to_y, to_x))
+        on_route = steer.copy()
+        on_route[steer] = np.hypot(to_x, to_y) < ROUTE_SLACK
+        lost = np.flatnonzero(steer & ~on_route)
+        if len(lost):
+            fx, fy = fields.flows["road"][fields.cell(self.x[lost], self.y[lost])].T
+            back = (fx != 0) | (fy != 0)
+            self.angle[lost[back]] = np.degrees(np.arctan2(fy[back], fx[back]))
+            ended = lost[~back]
+            landed = self.mh.road_cells[fields.cell(self.x[ended], self.y[ended])]
+            # Still heading at a waypoint within reach: nothing to look up
+            near = np.hypot(self.goal_x[ended] - self.x[ended], self.goal_y[ended] - self.y[ended]) <= RESUME_REACH
+            for i in ended[landed & ~near].tolist(): self.resume(i)
+            for i in ended[~landed].tolist(): self.rejoin(i)
+
+        moving = walking.copy()
+        vx, vy = np.zeros(n), np.zeros(n)
+        rad = np.radians(self.angle[walking])
+        vx[walking], vy[walking] = np.cos(rad) * self.speed[walking], np.sin(rad) * self.speed[walking]
+        if controlled is not None:
+            moving[controlled] = True
+            vx[controlled], vy[controlled] = control[0] * self.speed[controlled], control[1] * self.speed[controlled]
+
+        # One steering-field read at the spot each agent is about to step onto:
+        # motion into a wall is turned along it, and a step that would still
+        # land inside one is pushed back out along the normal
+        mv = np.flatnonzero(moving)
+        mx, my = vx[mv], vy[mv]
+        nx, ny, d = fields.steer[fields.cell(self.x[mv] + mx, self.y[mv] + my)].T
+        mx, my = slide(mx, my, nx, ny, d)
+        out = np.maximum(-d, 0.0)
+        self.x[mv] += mx + nx * out
+        self.y[mv] += my + ny * out
+        turned = walking[mv] & (d < CLEARANCE)
+        self.angle[mv[turned]] = np.degrees(np.arctan2(my[turned], mx[turned]))
+
+        arrived = on_route & (np.hypot(self.goal_x - self.x, self.goal_y - self.y) <= self.speed)
+        for i in np.flatnonzero(arrived).tolist(): self.advance_route(i)
+
+        self.grid.rebuild(self.x, self.y)
+        i, j, dist = self.grid.pairs(2 * AGENT_RADIUS)
+        if len(i): self.resolve_contacts(i, j, dist)
+
+    def resolve_contacts(self, i, j, dist):
+        # Trust contagion runs both ways across every contact pair
+        n, t = self.count, self.trust_level
+        ti, tj = t[i], t[j]
+        to_j = np.where((ti < 0.3) & (tj > 0.3), -0.05, np.where((ti > 0.8) & (tj < 0.8), 0.05, 0.0))
+        to_i = np.where((tj < 0.3) & (ti > 0.3), -0.05, np.where((tj > 0.8) & (ti < 0.8), 0.05, 0.0))
+        t += np.bincount(j, to_j, n) + np.bincount(i, to_i, n)
+        np.clip(t, 0.0, 1.0, out=t)
+        self.stats.update(np.concatenate((j[to_j != 0], i[to_i != 0])))
+
+        # Push-apart: each side of a pair moves the full overlap away from the other
+        overlap = 2 * AGENT_RADIUS - dist
+        apart = dist > 0
+        safe = np.where(apart, dist, 1.0)
+        ux = np.where(apart, (self.x[i] - self.x[j]) / safe, 1.0) * overlap
+        uy = np.where(apart, (self.y[i] - self.y[j]) / safe, 0.0) * overlap
+        px = self.x + np.bincount(i, ux, n) - np.bincount(j, ux, n)
+        py = self.y + np.bincount(i, uy, n) - np.bincount(j, uy, n)
+        # A push that would land on a wall pixel is dropped; otherwise the
+        # agent ends up inside the wall where every later move gets reverted
+        ok = self.mh.walk.walkable(px, py)
+        self.x[ok], self.y[ok] = px[ok], py[ok]
+
+def _column(name, cast, writable=True):
+    get = lambda a: cast(getattr(a.store, name)[a.id])
+    if not writable: return property(get)
+    return property(get, lambda a, v: getattr(a.store, name).__setitem__(a.id, v))
+
+def _set_trust(a, v):
+    # Clipped like every other trust write, and counted in the running stats
+    a.store.trust_level[a.id] = min(max(float(v), 0.0), 1.0)
+    a.store.stats.update([a.id])
+
+# Thin per-agent view over the store, used by selection, search and the sidebar
+class Agent:
+    __slots__ = ("id", "store")
+    radius = AGENT_RADIUS
+
+    def __init__(self, id, store):
+        self.id, self.store = id, store
+
+    x = _column("x", float)
+    y = _column("y", float)
+    angle = _column("angle", float)
+    speed = _column("speed", float)
+    trust_level = property(_column("trust_level", float).fget, _set_trust)
+    hostility = _column("hostility", float)
+    has_app = _column("has_app", bool, writable=False)    # The stats split agents by it once, at startup
+    timer = _column("timer", int)
+    activity = _column("activity", str)
+    username = _column("username", str)
+    role = _column("role", str)
+
+    @property
+    def state(self):
+        return STATE_NAMES[self.store.state[self.id]]
+
+    @state.setter
+    def state(self, name):
+        self.store.state[self.id] = STATE_NAMES.index(name)
 
 class Simulation:
-    def __init__(self):
-        pygame.init()
+    def __init__(self, headless=False, agent_count=AGENT_COUNT, seed=None, state_path=STATE_FILE, sync_interval=SYNC_INTERVAL, stream_port=None, journal=True, compress=False, stream_host=STREAM_HOST):
+        # Headless runs never open a display: no convert(), no fonts, no frame throttling
+        self.headless = headless
+        self.state_path = state_path
+        self.compress = compress
+        self.sync_interval = sync_interval
+        if seed is not None: random.seed(seed)
+        if headless:
+            self.screen = None
+        else:
+            pygame.init()
+            self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         self.sync_timer = 0
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
-        self.mh = MapHandler()
+        self.tick_count = 0
+        self.scheduled = []    # Heap of (tick, order, action, pos, options)
+        self.schedule_order = 0    # Same-tick entries fire in the order they were scheduled
+        self.queue = InterventionQueue()
+        self.interventions = 0
+        self.mh = MapHandler(convert=not headless)
         self.cam = Camera()
-        self.agents = [Agent(i, self.mh) for i in range(AGENT_COUNT)]
-        self.pulses = []
-        self.notifications = []
+        self.layers = None if headless else WorldRenderer(self.mh.surface, (MAP_AREA, HEIGHT))
+        self.heat = None if headless else HeatField(MAP_AREA, HEIGHT)
+        self.store = AgentStore(agent_count, self.mh, np.random.default_rng(seed))
+        self.agents = [Agent(i, self.store) for i in range(agent_count)]
+        self.pulses = PulsePool()
+        self.notifications = NotificationQueue(self.render_notification, int(NOTIFICATION_TIME * FPS))
         self.selected = None
         self.logs = []
         self.clock = pygame.time.Clock()
+        self.recent_events = deque(maxlen=RECENT_EVENTS)
+        self.snapshot_seq = 0
+        self.run_id = f"{os.getpid()}-{int(time.time())}"    # Tells terminals a restart from a repeat
+        self.journal = None
+        if journal:
+            # Picks up where the last run's history left off
+            self.journal = EventJournal(journal_dir_for(state_path))
+            self.recent_events.extend(JournalReader(self.journal.root).tail(RECENT_EVENTS))
+        # users.json, read once for both the roster names and the stream login
+        self.personnel = PersonnelDirectory().start()    # Reloads users.json off this thread
+        self.stream = None
+        if stream_port is not None:
+            # Live feed for field terminals; the JSON file keeps working without it
+            try: self.stream = StateStreamServer(stream_port, stream_host, personnel=self.personnel)
+            except OSError as e: self.add_log(f"STREAM OFFLINE: {e.strerror or e}")
+        self.profiler = FrameProfiler(PROFILE_PHASES)
+        self.charts, self.charts_at = None, -1    # Dashboard charts and the sample they show
 
         self.search_query = ""
         self.search_active = False
+        self.search_page = 0
+        self.search_more = False    # Another page of results follows this one
         self.filtered_agents = []
+        self.search_rect = pygame.Rect(MAP_AREA + 20, 180, 280, 30)
+        self.search = SearchIndex()    # Kept in step with the names by assign_names()
         
-        # Load Usernames
-        if os.path.exists("users.json"):
-            with open("users.json", "r") as f:
-                user_db = json.load(f)
-                personnel = user_db["authorized_personnel"]
-        else:
-            personnel = []
-            
-        for i, agent in enumerate(self.agents):
-            if i < len(personnel):
-                agent.username = personnel[i]["username"]
-                agent.role = personnel[i]["role"]
-            else:
-                agent.username = f"Civ_{i}"
-                agent.role = "Civilian"
+        # Roster members name the first agents, everyone else is a civilian
+        self.named = self.store.count    # Slots still to fill; all of them at first
+        self.assign_names()
 
         # Eye Graphic Setup (Display original eye image)
-        if os.path.exists("eye.png"):
+        if headless:
+            self.eye_img = None
+        elif os.path.exists("eye.png"):
             self.eye_img = pygame.image.load("eye.png").convert_alpha()
             self.eye_img = pygame.transform.scale(self.eye_img, (300, 300))
         else:
             # Fallback if image missing
             self.eye_img = pygame.Surface((300, 300), pygame.SRCALPHA)
             pygame.draw.circle(self.eye_img, (0, 255, 180, 180), (150, 150), 100, 2)
+        self.eye_frames = None if headless else AlphaFrames(self.eye_img)
             
         self.eye_timer = 0.0
 
-    def sync_to_file(self, event_type=None, pos=None, message=None):
-        heat_data = [[int(a.x), int(a.y), round(a.hostility, 2)] for a in self.agents]
-        data = {"recent_events": [], "heat_map": heat_data}
-        if os.path.exists("aegis_state.json"):
-            try:
-                with open("aegis_state.json", "r") as f:
-                    old_data = json.load(f)
-                    data["recent_events"] = old_data.get("recent_events", [])
-            except: pass
-
-        if event_type:
-            timestamp = time.strftime("%H:%M:%S")
-            data["recent_events"].append({
-                "type": event_type, 
-                "pos": [int(pos[0]), int(pos[1])], 
-                "timestamp": timestamp, 
-                "message": message
-            })
-            data["recent_events"] = data["recent_events"][-15:]
-
-        with open("aegis_state.json", "w") as f:
-            json.dump(data, f)
+    def assign_names(self):
+        # Roster members in file order, then civilians; on a reload only the
+        # slots the roster covers now or covered before are rewritten
+        st, pd = self.store, self.personnel
+        names, by_name, version = pd.roster()
+        named = min(len(names), st.count)
+        prev = self.named
+        touched = range(max(named, prev))
+        st.username[:named] = names[:named]
+        st.role[:named] = [by_name[n]["role"] for n in names[:named]]
+        st.username[named:prev] = [f"Civ_{i}" for i in range(named, prev)]
+        st.role[named:prev] = ["Civilian"] * max(0, prev - named)
+        self.named = named
+        self.names_version = version
+        if not self.search: self.search.build(st.username, st.role)
+        else:
+            for i in touched: self.search.set(i, st.username[i], st.role[i])    # No-op for unchanged slots
+        self.run_search()
+
+    def run_search(self, page=None):
+        # Only when the query, the page or the names change, not every frame
+        if page is not None: self.search_page = max(0, page)
+        ids, self.search_more = self.search.page(self.search_query, self.search_page)
+        if not ids and self.search_page:
+            self.search_page = 0
+            ids, self.search_more = self.search.page(self.search_query)
+        self.filtered_agents = [self.agents[i] for i in ids]
+
+    def reset_search(self):
+        self.search_query = ""
+        self.search_active = False
+        self.run_search(0)
+
+    def sync_to_file(self):
+        # Snapshot for terminals without the live stream (binary unless the
+        # path ends in .json). Events go to the journal instead.
+        st = self.store
+        self.snapshot_seq += 1
+        meta = {"run": self.run_id, "seq": self.snapshot_seq, "recent_events": list(self.recent_events), "stats": st.stats.summary()}
+        save_state(self.state_path, meta, st.x, st.y, st.hostility, (MAP_AREA, HEIGHT), self.compress)
+
+    def record_events(self, events):
+        # A tick's events in one journal write and one stream hand-off
+        if self.journal: events = self.journal.extend(events)
+        self.recent_events.extend(events)
+        if self.stream: self.stream.publish_events(events)
 
     def add_log(self, msg, aid=-1):
         self.logs.append((msg, aid))
         if len(self.logs) > 15: self.logs.pop(0)
 
     def add_notification(self, text):
-        self.notifications.append(Notification(text))
+        self.notifications.post(text)
+
+    def render_notification(self, text):
+        return render_text(f"!! {text} !!", COLOR_DANGER, 18, bold=True)
+
+    # --- INTERVENTIONS ---
+    # Keyboard handlers and scripted scenarios share these entry points. They
+    # only queue; apply_interventions() lands the whole tick's worth at once.
+    def seed_misinfo(self, x, y, radius=INTERVENTION_RADIUS, falloff=False):
+        self.queue.push("misinfo", x, y, radius, falloff)
+
+    def counter_narrative(self, x, y, radius=INTERVENTION_RADIUS, falloff=False):
+        self.queue.push("counter", x, y, radius, falloff)
+
+    def apply_interventions(self):
+        st = self.store
+        batch, hit, last = self.queue.apply(st.grid, st.trust_level, st.has_app)
+        if not batch: return
+        st.stats.update(hit)
+        riot = np.array([kind == "misinfo" for kind, *_ in batch])[last]
+        for i, phrase in zip(hit[riot].tolist(), random.choices(RIOT_PHRASES, k=int(riot.sum()))): st.activity[i] = phrase
+        for i in hit[~riot].tolist(): st.activity[i] = "Trusting the process."
+        stamp = time.strftime("%H:%M:%S")
+        events, counts = [], {}
+        for kind, x, y, _, _ in batch:
+            event_type, message, _, color = INTERVENTION_STYLE[kind]
+            events.append({"type": event_type, "pos": [int(x), int(y)], "timestamp": stamp, "message": message})
+            self.pulses.spawn(x, y, color)
+            counts[kind] = counts.get(kind, 0) + 1
+        self.record_events(events)
+        for kind, n in counts.items():
+            line = INTERVENTION_STYLE[kind][2]
+            self.add_log(line if n == 1 else f"{line} x{n}", -1)
+        self.interventions += len(batch)
+
+    def schedule(self, tick, action, pos, **options):
+        # action is "misinfo" or "counter"; fired at the start of that tick.
+        # options: radius, falloff
+        if action not in INTERVENTION_STYLE: raise ValueError(f"unknown intervention: {action}")
+        heapq.heappush(self.scheduled, (tick, self.schedule_order, action, pos, options))
+        self.schedule_order += 1
+
+    def step(self):
+        while self.scheduled and self.scheduled[0][0] <= self.tick_count:
+            _, _, action, (x, y), options = heapq.heappop(self.scheduled)
+            self.queue.push(action, x, y, **options)
+        self.apply_interventions()
+
+        prof = self.profiler
+        with prof.phase("camera"):
+            self.cam.update(self.selected)
+        with prof.phase("agents"):
+            if self.selected:
+                keys = pygame.key.get_pressed()
+                control = (keys[pygame.K_RIGHT] - keys[pygame.K_LEFT], keys[pygame.K_DOWN] - keys[pygame.K_UP])
+                self.store.tick(self.selected.id, control)
+            else:
+                self.store.tick()
+
+        self.pulses.update()
+        self.notifications.update()
+        if self.tick_count % SAMPLE_TICKS == 0:
+            self.store.stats.sample(self.tick_count)
+            if self.stream: self.stream.publish_stats(self.store.stats.summary())
+
+        self.sync_timer += 1
+        if self.sync_interval and self.sync_timer >= self.sync_interval:
+            with prof.phase("sync"):
+                self.sync_to_file()    # Broadcasts current agent positions
+                if self.personnel.version != self.names_version: self.assign_names()    # users.json was edited
+            self.sync_timer = 0    # Reset timer
+        if self.stream:
+            st = self.store
+            with prof.phase("sync"):
+                self.stream.publish(self.tick_count, st.x, st.y, st.hostility, (MAP_AREA, HEIGHT))
+        self.tick_count += 1
+
+    def summary(self):
+        st = self.store
+        return {
+            "ticks": self.tick_count,
+            "sim_seconds": round(self.tick_count / FPS, 2),
+            "agents": st.count,
+            "interventions": self.interventions,
+            "radicalized": st.stats.radicalized,
+            "global_trust": round(st.stats.mean_trust, 4),
+            "app_users": int(st.stats.members[1]),
+        }
+
+    def run_headless(self, ticks):
+        start = time.perf_counter()
+        for _ in range(ticks):
+            self.step()
+            self.profiler.end_frame()
+        wall = time.perf_counter() - start
+        self.sync_to_file()
+        result = self.summary()
+        result["wall_seconds"] = round(wall, 3)
+        result["ticks_per_sec"] = round(ticks / wall, 1) if wall > 0 else None
+        result["speedup"] = round(ticks / FPS / wall, 1) if wall > 0 else None
+        return result
 
     def draw_world(self):
-        world_surf = pygame.Surface((MAP_AREA, HEIGHT))
-        world_surf.blit(self.mh.surface, (0, 0))
-        
-        heat_surf = pygame.Surface((MAP_AREA, HEIGHT), pygame.SRCALPHA)
-        for a in self.agents:
-            if a.hostility > 0.6:
-                alpha = int(a.hostility * 90)
-                pygame.draw.circle(heat_surf, (255, 0, 0, alpha), (int(a.x), int(a.y)), 50)
-        world_surf.blit(heat_surf, (0, 0))
-
-        for p in self.pulses[:]:
-            if not p.update(): self.pulses.remove(p)
-            else: p.draw(world_surf)
-
-        for a in self.agents:
-            r = clamp(255 * a.hostility, 0, 255)
-            g = clamp(255 * (1 - a.hostility), 0, 255)
-            pygame.draw.circle(world_surf, (r, g, 50), (int(a.x), int(a.y)), a.radius)
-            if a.has_app: pygame.draw.circle(world_surf, COLOR_WHITE, (int(a.x), int(a.y)), a.radius+2, 1)
-
-        zoom = self.cam.zoom
-        sub_rect = pygame.Rect(self.cam.x, self.cam.y, MAP_AREA/zoom, HEIGHT/zoom)
-        scaled_view = pygame.transform.scale(world_surf.subsurface(sub_rect), (MAP_AREA, HEIGHT))
-        self.screen.blit(scaled_view, (0, 0))
+        # Map from the renderer's cached layer; heat, pulses and agents in screen space
+        view, screen, st = self.layers, self.screen, self.store
+        view.begin(screen, self.cam.view_rect())
+        zoom = view.scale[0]
+
+        # Heat comes from the density grid: one upscaled blit whatever the headcount
+        self.heat.update(st.x, st.y, st.hostility)
+        r = self.heat.draw(screen, view)
+        if r: view.mark(r)
+
+        mark = view.mark
+        self.pulses.draw(screen, view, mark)
+
+        # Only agents inside the camera rect (plus a ring's width) are drawn,
+        # so tracking a suspect at 2.2x costs about a fifth of the full map
+        cull = view.visible(AGENT_RADIUS + 2)
+        vis = st.grid.query_rect(cull.left, cull.top, cull.right, cull.bottom)
+        sx, sy = view.to_screen(st.x[vis], st.y[vis])
+        xs, ys = sx.astype(int).tolist(), sy.astype(int).tolist()
+        body, ring, ring_w = max(int(AGENT_RADIUS * zoom), 1), int((AGENT_RADIUS+2) * zoom), max(int(zoom), 1)
+        reds = np.clip(255 * st.hostility[vis], 0, 255).astype(int).tolist()
+        for x, y, r, app in zip(xs, ys, reds, st.has_app[vis].tolist()):
+            rect = pygame.draw.circle(screen, (r, 255 - r, 50), (x, y), body)
+            if app: rect = pygame.draw.circle(screen, COLOR_WHITE, (x, y), ring, ring_w)
+            mark(rect)
+        screen.set_clip(None)
 
     def update_eye(self):
         if self.eye_timer > 0:
@@ -283,154 +621,231 @@ class Simulation:
             progress = self.eye_timer / EYE_FADE_TIME
             # Pulsing alpha
             alpha = int(clamp(math.sin(progress * math.pi) * 255, 0, 255))
-            temp_eye = self.eye_img.copy()
-            # Apply transparency to the original eye image
-            temp_eye.set_alpha(alpha)
-            # Center the original eye.png on the target screen area
-            self.screen.blit(temp_eye, (MAP_AREA//2 - 150, HEIGHT//2 - 150))
+            # Pre-faded copy of the original eye image, centred on the map area
+            eye = self.eye_frames.get(alpha)
+            if eye: self.layers.mark(self.screen.blit(eye, (MAP_AREA//2 - 150, HEIGHT//2 - 150)))
 
     def draw_misinfo_box(self):
-        box_rect = pygame.Rect(20, 20, 280, 100)
-        pygame.draw.rect(self.screen, (10, 10, 15), box_rect)
+        # Numbers come from the running aggregates; the charts are redrawn
+        # only when a new sample lands
+        stats = self.store.stats
+        box_rect = pygame.Rect(20, 20, 280, 175)
+        self.layers.mark(pygame.draw.rect(self.screen, (10, 10, 15), box_rect))
         pygame.draw.rect(self.screen, COLOR_ACCENT, box_rect, 2)
         
-        f = pygame.font.SysFont("Courier", 14, bold=True)
-        misinfo_count = len([a for a in self.agents if a.trust_level < 0.3])
-        trust_avg = sum(a.trust_level for a in self.agents) / len(self.agents)
-        
-        self.screen.blit(f.render(f"RADICALIZED: {misinfo_count}", True, COLOR_DANGER), (35, 35))
-        self.screen.blit(f.render(f"GLOBAL TRUST: {int(trust_avg*100)}%", True, COLOR_TRUST), (35, 60))
+        trust_avg = stats.mean_trust
+        self.screen.blit(render_text(f"RADICALIZED: {stats.radicalized}", COLOR_DANGER, bold=True), (35, 35))
+        self.screen.blit(render_text(f"GLOBAL TRUST: {int(trust_avg*100)}%", COLOR_TRUST, bold=True), (35, 60))
         pygame.draw.rect(self.screen, (40, 40, 40), (35, 85, 200, 5))
         pygame.draw.rect(self.screen, COLOR_TRUST, (35, 85, int(200*trust_avg), 5))
-
-    def run(self):
-        while True:
-            self.screen.fill(COLOR_BG)
-            self.draw_world()
+        split = f"APP {int(stats.group_trust(True)*100)}%  NO APP {int(stats.group_trust(False)*100)}%"
+        self.screen.blit(render_text(split, (120, 120, 130)), (35, 97))
+        if self.charts_at != stats.samples:
+            self.charts = self.render_charts(stats)
+            self.charts_at = stats.samples
+        self.screen.blit(self.charts, (35, 120))
+
+    def render_charts(self, stats, size=(250, 60)):
+        # Trust (blue) and radicalized share (red) over the sample history on
+        # the left, the trust histogram (app users on top) on the right
+        surf = pygame.Surface(size)
+        surf.fill((16, 16, 24))
+        w, h = size
+        tw = w - TRUST_BINS * 8 - 10
+        trend, _ = stats.history()
+        if len(trend) > 1:
+            xs = np.linspace(0, tw - 1, len(trend))
+            for col, color in ((1, COLOR_TRUST), (2, COLOR_DANGER)):
+                ys = trend[:, col] / (max(stats.count, 1) if col == 2 else 1.0)
+                pygame.draw.lines(surf, color, False, list(zip(xs.tolist(), (h - 1 - ys * (h - 1)).tolist())))
+        counts = stats.hist
+        top = max(int(counts.sum(axis=0).max()), 1)
+        for b in range(TRUST_BINS):
+            x = tw + 10 + b * 8
+            off, on = (int(c * (h - 1) / top) for c in counts[:, b])
+            pygame.draw.rect(surf, (70, 70, 80), (x, h - off, 6, off))
+            pygame.draw.rect(surf, COLOR_TRUST, (x, h - off - on, 6, on))
+        return surf
+
+    def draw_sidebar(self):
+        pygame.draw.rect(self.screen, COLOR_UI_PANEL, (MAP_AREA, 0, UI_WIDTH, HEIGHT))
+        self.screen.blit(render_text("[R] Seed Misinfo", COLOR_DANGER), (MAP_AREA+20, 20))
+        self.screen.blit(render_text("[P] Counter Narrative", COLOR_ACCENT), (MAP_AREA+20, 40))
+        
+        if self.selected:
+            self.screen.blit(render_text(f"ENTITY: {self.selected.username}", COLOR_ACCENT), (MAP_AREA+20, 80))
+            self.screen.blit(render_text(f"ROLE: {self.selected.role}", COLOR_WHITE), (MAP_AREA+20, 100))
+            self.screen.blit(render_text(f"TRUST: {int(self.selected.trust_level*100)}%", COLOR_WHITE), (MAP_AREA+20, 120))
+            self.screen.blit(render_text(f"ACT: {self.selected.activity}", (200, 200, 200)), (MAP_AREA+20, 145))
+        
+        for i, (m, aid) in enumerate(reversed(self.logs)):
+            self.screen.blit(render_text(f"> {m}", (120, 120, 130)), (MAP_AREA+20, HEIGHT - 30 - i*20))
+
+        # --- SEARCH BAR RENDER ---
+        pygame.draw.rect(self.screen, (30, 30, 40), self.search_rect)
+        color = COLOR_ACCENT if self.search_active else (100, 100, 100)
+        pygame.draw.rect(self.screen, color, self.search_rect, 1)
+        search_label = render_text(f"SEARCH: {self.search_query}_", COLOR_WHITE)
+        self.screen.blit(search_label, (MAP_AREA + 30, 187))
+
+        # --- SEARCH RESULTS LOGIC ---
+        if self.search_query:
+            for i, fa in enumerate(self.filtered_agents):
+                res_rect = pygame.Rect(MAP_AREA + 20, 220 + (i*25), 280, 22)
+                pygame.draw.rect(self.screen, (20, 20, 30), res_rect)
+                res_txt = render_text(f" > {fa.username} ({fa.role})", COLOR_ACCENT)
+                self.screen.blit(res_txt, (MAP_AREA + 25, 223 + (i*25)))
+            if self.search_page or self.search_more:
+                more = "  [PGDN] more" if self.search_more else ""
+                self.screen.blit(render_text(f"PAGE {self.search_page + 1}{more}", (120, 120, 130)), (MAP_AREA + 25, 223 + PAGE_SIZE*25))
+
+    def draw_notifications(self):
+        self.notifications.draw(self.screen, (20, HEIGHT - 50), self.layers.mark)
+
+    def render(self):
+        # Returns the screen rects to present, or None for a full flip
+        prof = self.profiler
+        with prof.phase("draw_world"): self.draw_world()
+        with prof.phase("hud"):
             self.draw_misinfo_box()
+            self.update_eye()
+        with prof.phase("sidebar"): self.draw_sidebar()
+        with prof.phase("notifications"): self.draw_notifications()
+        overlay = prof.draw_overlay(self.screen, MAP_AREA - 340, 20)
+        if overlay: self.layers.mark(overlay)
+        updates = self.layers.end()
+        return None if updates is None else updates + [pygame.Rect(MAP_AREA, 0, UI_WIDTH, HEIGHT)]
+
+    def handle_events(self):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT: return False
             
-            # Sidebar UI
-            pygame.draw.rect(self.screen, COLOR_UI_PANEL, (MAP_AREA, 0, UI_WIDTH, HEIGHT))
-            f = pygame.font.SysFont("Courier", 14)
-            self.screen.blit(f.render("[R] Seed Misinfo", True, COLOR_DANGER), (MAP_AREA+20, 20))
-            self.screen.blit(f.render("[P] Counter Narrative", True, COLOR_ACCENT), (MAP_AREA+20, 40))
-            
-            if self.selected:
-                self.screen.blit(f.render(f"ENTITY: {self.selected.username}", True, COLOR_ACCENT), (MAP_AREA+20, 80))
-                self.screen.blit(f.render(f"ROLE: {self.selected.role}", True, COLOR_WHITE), (MAP_AREA+20, 100))
-                self.screen.blit(f.render(f"TRUST: {int(self.selected.trust_level*100)}%", True, COLOR_WHITE), (MAP_AREA+20, 120))
-                self.screen.blit(f.render(f"ACT: {self.selected.activity}", True, (200, 200, 200)), (MAP_AREA+20, 145))
-            
-            for i, (m, aid) in enumerate(reversed(self.logs)):
-                self.screen.blit(f.render(f"> {m}", True, (120, 120, 130)), (MAP_AREA+20, HEIGHT - 30 - i*20))
-
-            # --- SEARCH BAR RENDER ---
-            search_bg = pygame.Rect(MAP_AREA + 20, 180, 280, 30)
-            pygame.draw.rect(self.screen, (30, 30, 40), search_bg)
-            color = COLOR_ACCENT if self.search_active else (100, 100, 100)
-            pygame.draw.rect(self.screen, color, search_bg, 1)
-            search_label = f.render(f"SEARCH: {self.search_query}_", True, COLOR_WHITE)
-            self.screen.blit(search_label, (MAP_AREA + 30, 187))
-
-            # --- SEARCH RESULTS LOGIC ---
-            if self.search_query:
-                self.filtered_agents = [a for a in self.agents if self.search_query.lower() in a.username.lower()][:8]
-                for i, fa in enumerate(self.filtered_agents):
-                    res_rect = pygame.Rect(MAP_AREA + 20, 220 + (i*25), 280, 22)
-                    pygame.draw.rect(self.screen, (20, 20, 30), res_rect)
-                    res_txt = f.render(f" > {fa.username} ({fa.role})", True, COLOR_ACCENT)
-                    self.screen.blit(res_txt, (MAP_AREA + 25, 223 + (i*25)))
-
-            self.sync_timer += 1
-            if self.sync_timer >= 120: # 60 FPS * 2 Seconds = 120
-                self.sync_to_file()    # Broadcasts current agent positions
-                self.sync_timer = 0    # Reset timer
-
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT: return
+            if event.type == pygame.MOUSEWHEEL and self.search_query:
+                # Wheel pages through the results while a query is typed
+                if self.search_more or event.y > 0: self.run_search(self.search_page - event.y)
+                continue
+
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button in (4, 5) and self.search_query: continue    # Wheel, paged above
+                mx, my = pygame.mouse.get_pos()
                 
-                if event.type == pygame.MOUSEBUTTONDOWN:
+                # Search Bar Click Detection
+                if self.search_rect.collidepoint(mx, my):
+                    self.search_active = True
+                else:
+                    self.search_active = False
+
+                # Search Result Click Detection
+                if self.search_query:
+                    for i in range(len(self.filtered_agents)):
+                        res_rect = pygame.Rect(MAP_AREA + 20, 220 + (i*25), 280, 22)
+                        if res_rect.collidepoint(mx, my):
+                            self.selected = self.filtered_agents[i]
+                            self.eye_timer = EYE_FADE_TIME
+                            self.reset_search()
+                            break
+
+                if mx < MAP_AREA:
+                    w_mx = (mx / MAP_AREA) * (MAP_AREA / self.cam.zoom) + self.cam.x
+                    w_my = (my / HEIGHT) * (HEIGHT / self.cam.zoom) + self.cam.y
+                    hits = self.store.grid.query_radius(w_mx, w_my, 20)
+                    target = self.agents[hits[0]] if len(hits) else None
+                    if target:
+                        if target.has_app:
+                            self.selected = target
+                            self.eye_timer = EYE_FADE_TIME
+                        else: self.add_notification("ENCRYPTION ERROR, ACCESS DENIED")
+                    else: self.selected = None
+
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.profiler.toggle()
+                continue
+
+            if event.type == pygame.KEYDOWN:
+                if self.search_active:
+                    if event.key == pygame.K_BACKSPACE:
+                        self.search_query = self.search_query[:-1]
+                        self.run_search(0)
+                    elif event.key == pygame.K_RETURN:
+                        if self.filtered_agents:
+                            self.selected = self.filtered_agents[0]
+                            self.eye_timer = EYE_FADE_TIME
+                            self.reset_search()
+                    elif event.key == pygame.K_PAGEDOWN:
+                        if self.search_more: self.run_search(self.search_page + 1)
+                    elif event.key == pygame.K_PAGEUP:
+                        self.run_search(self.search_page - 1)
+                    elif event.unicode and event.unicode.isprintable():
+                        self.search_query += event.unicode
+                        self.run_search(0)
+                else:
+                    # KEYBOARD ACTIONS (ONLY IF NOT SEARCHING)
                     mx, my = pygame.mouse.get_pos()
+                    w_mx = (mx / MAP_AREA) * (MAP_AREA / self.cam.zoom) + self.cam.x
+                    w_my = (my / HEIGHT) * (HEIGHT / self.cam.zoom) + self.cam.y
                     
-                    # Search Bar Click Detection
-                    if search_bg.collidepoint(mx, my):
-                        self.search_active = True
-                    else:
-                        self.search_active = False
-
-                    # Search Result Click Detection
-                    if self.search_query:
-                        for i in range(len(self.filtered_agents)):
-                            res_rect = pygame.Rect(MAP_AREA + 20, 220 + (i*25), 280, 22)
-                            if res_rect.collidepoint(mx, my):
-                                self.selected = self.filtered_agents[i]
-                                self.eye_timer = EYE_FADE_TIME
-                                self.search_query = ""
-                                self.search_active = False
-
-                    if mx < MAP_AREA:
-                        w_mx = (mx / MAP_AREA) * (MAP_AREA / self.cam.zoom) + self.cam.x
-                        w_my = (my / HEIGHT) * (HEIGHT / self.cam.zoom) + self.cam.y
-                        target = next((a for a in self.agents if math.hypot(a.x-w_mx, a.y-w_my) < 20), None)
-                        if target:
-                            if target.has_app:
-                                self.selected = target
-                                self.eye_timer = EYE_FADE_TIME
-                            else: self.add_notification("ENCRYPTION ERROR, ACCESS DENIED")
-                        else: self.selected = None
-
-                if event.type == pygame.KEYDOWN:
-                    if self.search_active:
-                        if event.key == pygame.K_BACKSPACE:
-                            self.search_query = self.search_query[:-1]
-                        elif event.key == pygame.K_RETURN:
-                            if self.filtered_agents:
-                                self.selected = self.filtered_agents[0]
-                                self.eye_timer = EYE_FADE_TIME
-                                self.search_active = False
-                                self.search_query = ""
-                        else:
-                            self.search_query += event.unicode
-                    else:
-                        # KEYBOARD ACTIONS (ONLY IF NOT SEARCHING)
-                        mx, my = pygame.mouse.get_pos()
-                        w_mx = (mx / MAP_AREA) * (MAP_AREA / self.cam.zoom) + self.cam.x
-                        w_my = (my / HEIGHT) * (HEIGHT / self.cam.zoom) + self.cam.y
-                        
-                        if event.key == pygame.K_r: 
-                            self.sync_to_file("MISINFO", (w_mx, w_my), "RIOT SEEDED")
-                            self.add_log("MISINFO SPIKE DETECTED", -1)
-                            self.pulses.append(Pulse(w_mx, w_my, COLOR_DANGER, max_radius=150))
-                            for a in self.agents:
-                                if math.hypot(a.x - w_mx, a.y - w_my) < 150:
-                                    a.trust_level = 0.0
-                                    a.activity = random.choice(RIOT_PHRASES)
-
-                        if event.key == pygame.K_p:
-                            self.sync_to_file("COUNTER", (w_mx, w_my), "TRUTH SYNCED")
-                            self.add_log("COUNTER-NARRATIVE DEPLOYED", -1)
-                            self.pulses.append(Pulse(w_mx, w_my, COLOR_ACCENT, max_radius=150))
-                            for a in self.agents:
-                                if math.hypot(a.x - w_mx, a.y - w_my) < 150 and a.has_app:
-                                    a.trust_level = 1.0
-                                    a.activity = "Trusting the process."
+                    if event.key == pygame.K_r: self.seed_misinfo(w_mx, w_my)
+                    if event.key == pygame.K_p: self.counter_narrative(w_mx, w_my)
+        return True
 
-            self.cam.update(self.selected)
-            for a in self.agents:
-                a.update(a == self.selected, self.agents, self.pulses)
-
-            self.update_eye()
-            for n in self.notifications[:]:
-                if n.update():
-                    f_notif = pygame.font.SysFont("Courier", 18, bold=True)
-                    t_surf = f_notif.render(f"!! {n.text} !!", True, COLOR_DANGER)
-                    t_surf.set_alpha(n.alpha)
-                    self.screen.blit(t_surf, (20, HEIGHT - 50))
-                else: self.notifications.remove(n)
-
-            pygame.display.flip()
+    def run(self):
+        prof = self.profiler
+        while True:
+            with prof.phase("events"):
+                running = self.handle_events()
+            if not running: return
+            self.step()
+            updates = self.render()
+            with prof.phase("present"):
+                if updates is None: pygame.display.flip()
+                else: pygame.display.update(updates)
+            prof.end_frame()
             self.clock.tick(FPS)
 
+def main():
+    parser = argparse.ArgumentParser(description="Aegis admin simulation")
+    parser.add_argument("--headless", action="store_true", help="run without a display as fast as possible")
+    parser.add_argument("--ticks", type=int, default=FPS * 60 * 60, help="ticks to simulate in headless mode")
+    parser.add_argument("--agents", type=int, default=AGENT_COUNT)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--script", help="JSON list of {tick, action, pos} interventions")
+    parser.add_argument("--out", default=STATE_FILE, help="state file (.json for the readable debug format)")
+    parser.add_argument("--compress", action="store_true", help="zlib the binary state file (smaller, ~15x slower to write)")
+    parser.add_argument("--summary", help="also write the run summary to this file")
+    parser.add_argument("--profile-csv", help="stream per-frame phase timings (ms) to this CSV file")
+    parser.add_argument("--sync-every", type=int, default=SYNC_INTERVAL, help="ticks between state writes, 0 to only write at the end")
+    parser.add_argument("--stream-port", type=int, default=STREAM_PORT, help="TCP port for the live terminal feed")
+    parser.add_argument("--stream-host", default=STREAM_HOST, help="interface to serve terminals on (0.0.0.0 for other machines)")
+    parser.add_argument("--no-stream", action="store_true", help="don't serve the live terminal feed")
+    args = parser.parse_args()
+
+    sim = Simulation(headless=args.headless, agent_count=args.agents, seed=args.seed,
+                     state_path=args.out, sync_interval=args.sync_every,
+                     stream_port=None if args.no_stream else args.stream_port, compress=args.compress,
+                     stream_host=args.stream_host)
+    sink = None
+    if args.profile_csv:
+        sink = CsvSink(args.profile_csv, PROFILE_PHASES)
+        sim.profiler.add_sink(sink)
+    try:
+        if not args.headless:
+            sim.run()
+            return
+        if args.script:
+            with open(args.script, "r") as f:
+                for entry in json.load(f):
+                    sim.schedule(entry["tick"], entry["action"], entry["pos"], **{k: entry[k] for k in ("radius", "falloff") if k in entry})
+        result = sim.run_headless(args.ticks)
+    finally:
+        if sink: sink.close()
+        if sim.stream: sim.stream.close()
+        if sim.journal: sim.journal.close()
+        sim.personnel.stop()
+
+    print(json.dumps(result, indent=2))
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(result, f, indent=2)
+
 if __name__ == "__main__":
-    Simulation().run()
+    main()
@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+
+# Benchmarks never need a real window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PHASES = ("update", "draw_world", "ui", "sync")
+AGENT_COUNTS = (50, 500, 5000, 50000)
+SYNC_EVERY = 120  # Matches the admin's 2 s broadcast at 60 FPS
+
+# --- TARGET DRIVERS ---
+# Each driver builds a seeded simulation and returns a frame function that
+# reports seconds spent per phase. Phases a target doesn't have report 0.
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def drive_admin(count, seed, state_path):
+    import admin
+    sim = admin.Simulation(agent_count=count, seed=seed, state_path=state_path, sync_interval=0, journal=False)
+    frame_no = [0]
+
+    def ui():
+        sim.draw_misinfo_box(); sim.draw_sidebar(); sim.update_eye(); sim.draw_notifications()
+
+    def frame():
+        # No screen.fill: the world renderer restores only what changed
+        t = {"update": timed(sim.step), "draw_world": timed(sim.draw_world), "ui": timed(ui), "sync": 0.0}
+        sim.layers.end()
+        frame_no[0] += 1
+        if frame_no[0] % SYNC_EVERY == 0: t["sync"] = timed(sim.sync_to_file)
+        return t
+    return frame
+
+def drive_stable(count, seed, state_path):
+    import stable
+    random.seed(seed)
+    stable.AGENT_COUNT = count
+    sim = stable.Simulation()
+
+    def update():
+        sim.camera.update(None)
+        for a in sim.agents: a.update(is_controlled=False)
+
+    def ui():
+        sim.draw_ui(); sim.draw_scanlines()
+
+    def frame():
+        sim.screen.fill(stable.COLOR_BG)
+        return {"update": timed(update), "draw_world": timed(sim.draw_world), "ui": timed(ui), "sync": 0.0}
+    return frame
+
+def drive_mbtest(count, seed, state_path):
+    import mbtest
+    random.seed(seed)
+    mbtest.AGENT_COUNT = count
+    sim = mbtest.Simulation()
+    # mbtest.draw() renders the world and calls draw_ui() itself, so split them here
+    ui_time = [0.0]
+    draw_ui = sim.draw_ui
+    def timed_ui():
+        ui_time[0] += timed(draw_ui)
+    sim.draw_ui = timed_ui
+
+    def update():
+        sim.camera.update(None)
+        for a in sim.agents: a.update(False, sim.agents)
+
+    def frame():
+        sim.screen.fill(mbtest.COLOR_BG)
+        ui_time[0] = 0.0
+        draw = timed(sim.draw)
+        return {"update": timed(update), "draw_world": draw - ui_time[0], "ui": ui_time[0], "sync": 0.0}
+    return frame
+
+def drive_engine(count, seed, state_path):
+    import engine
+    random.seed(seed)
+    eng = engine.AegisEngine()
+    eng.agents = eng.spawn_agents(count)
+    return lambda: {"update": timed(eng.update), "draw_world": timed(eng.draw), "ui": 0.0, "sync": 0.0}
+
+# max_agents guards the targets whose update is still O(n^2) per frame
+TARGETS = {
+    "admin": (drive_admin, None),
+    "stable": (drive_stable, None),
+    "mbtest": (drive_mbtest, 5000),
+    "engine": (drive_engine, 5000),
+}
+
+# --- MEASUREMENT ---
+def stats_ms(samples):
+    arr = np.asarray(samples) * 1000.0
+    return {
+        "mean": round(float(arr.mean()), 3),
+        "p50": round(float(np.percentile(arr, 50)), 3),
+        "p99": round(float(np.percentile(arr, 99)), 3),
+    }
+
+def run_case(target, count, frames, warmup, seed, budget):
+    from text import cache as text_cache
+    driver, max_agents = TARGETS[target]
+    case = {"target": target, "agents": count}
+    if max_agents and count > max_agents:
+        case["skipped"] = f"above {max_agents} agents (O(n^2) update)"
+        return case
+    state_path = os.path.join(tempfile.gettempdir(), f"aegis_bench_{os.getpid()}.bin")
+    text_cache.clear()
+    try:
+        frame = driver(count, seed, state_path)
+    except Exception as e:
+        pygame.display.quit()
+        case["skipped"] = f"{type(e).__name__}: {e}"
+        return case
+
+    for _ in range(warmup): frame()
+    samples = {p: [] for p in PHASES}
+    start = time.perf_counter()
+    while len(samples["update"]) < frames:
+        t = frame()
+        for p in PHASES: samples[p].append(t[p])
+        if time.perf_counter() - start > budget: break
+    pygame.event.pump()
+    # Each target opens its own window mode; start the next case from scratch
+    pygame.display.quit()
+    if os.path.exists(state_path): os.remove(state_path)
+
+    totals = [sum(t) for t in zip(*(samples[p] for p in PHASES))]
+    case["frames"] = len(totals)
+    case["ticks_per_sec"] = round(len(totals) / sum(samples["update"]), 1) if sum(samples["update"]) else None
+    case["fps"] = round(len(totals) / sum(totals), 1)
+    case["frame_ms"] = stats_ms(totals)
+    case["phases_ms"] = {p: stats_ms(samples[p]) for p in PHASES}
+    case["text_cache"] = text_cache.stats()
+    return case
+
+def compare(old, new):
+    # Prints p50 frame time ratios for cases present in both runs
+    before = {(c["target"], c["agents"]): c for c in old["results"] if "frame_ms" in c}
+    print(f"{'target':<8}{'agents':>8}{'old p50':>12}{'new p50':>12}{'ratio':>8}")
+    for c in new["results"]:
+        prev = before.get((c["target"], c["agents"]))
+        if not prev or "frame_ms" not in c: continue
+        a, b = prev["frame_ms"]["p50"], c["frame_ms"]["p50"]
+        print(f"{c['target']:<8}{c['agents']:>8}{a:>12.3f}{b:>12.3f}{(b / a if a else 0):>8.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Aegis simulation tick/frame benchmark")
+    parser.add_argument("--targets", nargs="+", default=list(TARGETS), choices=list(TARGETS))
+    parser.add_argument("--agents", nargs="+", type=int, default=list(AGENT_COUNTS))
+    parser.add_argument("--frames", type=int, default=240)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--budget", type=float, default=30.0, help="max seconds of measured frames per case")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    results = []
+    for target in args.targets:
+        for count in args.agents:
+            case = run_case(target, count, args.frames, args.warmup, args.seed, args.budget)
+            results.append(case)
+            if "skipped" in case: print(f"{target:<8}{count:>7}  skipped: {case['skipped']}")
+            else: print(f"{target:<8}{count:>7}  {case['ticks_per_sec']:>9} ticks/s  p50 {case['frame_ms']['p50']:>8} ms  p99 {case['frame_ms']['p99']:>8} ms")
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "seed": args.seed, "frames": args.frames, "warmup": args.warmup,
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
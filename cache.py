@@ -0,0 +1,42 @@
+import os
+import hashlib
+
+import numpy as np
+
+# Derived map data (road graphs, fields, scaled assets) lives here, keyed by
+# a digest of the source image and the parameters it was built with.
+CACHE_DIR = ".aegis_cache"
+
+_hashed = {}  # (path, mtime, size) -> content hash, so one launch reads each map once
+
+def file_digest(path, *params):
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    if key not in _hashed:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""): h.update(chunk)
+        _hashed[key] = h.hexdigest()
+    return hashlib.sha1(f"{_hashed[key]}{params!r}".encode()).hexdigest()[:20]
+
+def cache_path(kind, digest, ext):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, f"{kind}_{digest}.{ext}")
+
+def atomic_write(path, mode, writer):
+    # writer(f) fills a file beside path, which is then renamed over it, so
+    # readers never see half a file; a failed write leaves no temp file behind
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, mode) as f: writer(f)
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+
+def save_array(path, data):
+    atomic_write(path, "wb", lambda f: np.save(f, data))
+
+def load_array(path):
+    return np.load(path, mmap_mode="r") if os.path.exists(path) else None
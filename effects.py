@@ -0,0 +1,153 @@
+from collections import OrderedDict
+
+import pygame
+
+ALPHA_STEPS = 16        # Fade levels pre-rendered per sprite
+MAX_PULSES = 64         # Past this a new pulse recycles the oldest one
+PULSE_START = 2
+PULSE_GROWTH = 2.5      # Radius gained per tick
+PULSE_FADE = 10         # Alpha lost per tick
+PULSE_WIDTH = 2
+RING_STEP = 4           # Screen radii are rounded up to a multiple of this
+RING_CACHE_SIZE = 48    # Ring sprites kept, least recently drawn dropped first
+
+def faded(surface, alpha):
+    # Copy of surface with its per-pixel alpha scaled by alpha/255
+    out = surface.copy()
+    out.fill((255, 255, 255, alpha), special_flags=pygame.BLEND_RGBA_MULT)
+    return out
+
+# --- PRE-RENDERED FADES ---
+# A fading sprite is blitted from one of ALPHA_STEPS copies with the fade
+# already baked in, so nothing is copied or re-rendered while it fades.
+# Levels are rendered the first time they are needed.
+class AlphaFrames:
+    def __init__(self, surface, steps=ALPHA_STEPS):
+        self.surface = surface
+        self.steps = steps
+        self.frames = [None] * (steps + 1)
+
+    def get(self, alpha):
+        # None once the sprite has faded out
+        level = min(max(round(alpha * self.steps / 255), 0), self.steps)
+        if not level: return None
+        if self.frames[level] is None:
+            self.frames[level] = self.surface if level == self.steps else faded(self.surface, 255 * level // self.steps)
+        return self.frames[level]
+
+# --- PULSES ---
+class Pulse:
+    __slots__ = ("x", "y", "color", "age")
+
+    def reset(self, x, y, color):
+        self.x, self.y, self.color, self.age = x, y, color, 0
+        return self
+
+    @property
+    def radius(self):
+        return PULSE_START + PULSE_GROWTH * self.age
+
+    @property
+    def alpha(self):
+        return 255 - PULSE_FADE * self.age
+
+    def update(self):
+        self.age += 1
+        return self.alpha > 0
+
+# Ring sprites depend only on colour and screen radius, so a burst of pulses
+# shares them. Radii are rounded up to RING_STEP and the sprites kept in an
+# LRU, so zooming in and out doesn't pile up rings. Pulse objects are
+# recycled through a free list, and the active set is capped, so key spam
+# can't grow the per-frame cost.
+class PulsePool:
+    def __init__(self, capacity=MAX_PULSES, ring_capacity=RING_CACHE_SIZE):
+        self.capacity = capacity
+        self.ring_capacity = ring_capacity
+        self.active, self.free = [], []
+        self.rings = OrderedDict()
+
+    def __len__(self):
+        return len(self.active)
+
+    def spawn(self, x, y, color):
+        if len(self.active) >= self.capacity: pulse = self.active.pop(0)
+        else: pulse = self.free.pop() if self.free else Pulse()
+        self.active.append(pulse.reset(x, y, color))
+
+    def update(self):
+        alive = []
+        for p in self.active: (alive if p.update() else self.free).append(p)
+        self.active = alive
+
+    def ring(self, color, r):
+        key = (color, r)
+        frames = self.rings.get(key)
+        if frames is not None:
+            self.rings.move_to_end(key)
+            return frames
+        sprite = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, color, (r, r), r, PULSE_WIDTH)
+        frames = self.rings[key] = AlphaFrames(sprite)
+        if len(self.rings) > self.ring_capacity: self.rings.popitem(last=False)
+        return frames
+
+    def draw(self, surface, view, mark):
+        # Screen space, through the world renderer's camera transform
+        for p in self.active:
+            r = -(-max(int(p.radius * view.scale[0]), 1) // RING_STEP) * RING_STEP
+            x, y = view.to_screen(p.x, p.y)
+            dest = pygame.Rect(int(x - r), int(y - r), 2 * r, 2 * r)
+            if not view.bounds.colliderect(dest): continue    # Off camera
+            sprite = self.ring(p.color, r).get(p.alpha)
+            if sprite: mark(surface.blit(sprite, dest))
+
+# --- NOTIFICATIONS ---
+class Notification:
+    def __init__(self, text):
+        self.text = text
+        self.duration = 0
+        self.timer = 0
+
+    def restart(self, duration):
+        self.duration = self.timer = duration
+
+    @property
+    def alpha(self):
+        return min(max(int(self.timer / self.duration * 255), 0), 255)
+
+    def update(self):
+        self.timer -= 1
+        return self.timer > 0
+
+# Each distinct message is rendered once and faded from pre-rendered frames.
+# Repeating a message that is still on screen restarts it instead of
+# stacking another copy on top.
+class NotificationQueue:
+    def __init__(self, render, duration):
+        self.render = render        # text -> surface, only called on first use
+        self.duration = duration    # Ticks on screen
+        self.active = []
+        self.frames = {}
+
+    def __len__(self):
+        return len(self.active)
+
+    def post(self, text):
+        for n in self.active:
+            if n.text == text:
+                n.restart(self.duration)
+                return
+        n = Notification(text)
+        n.restart(self.duration)
+        self.active.append(n)
+
+    def update(self):
+        self.active = [n for n in self.active if n.update()]
+
+    def draw(self, surface, pos, mark):
+        for n in self.active:
+            frames = self.frames.get(n.text)
+            if frames is None: frames = self.frames[n.text] = AlphaFrames(self.render(n.text))
+            sprite = frames.get(n.alpha)
+            if sprite: mark(surface.blit(sprite, pos))
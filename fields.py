@@ -0,0 +1,144 @@
+import os
+import math
+import hashlib
+
+import numpy as np
+
+from cache import file_digest, cache_path, save_array, load_array
+from roads import STEPS
+
+FIELD_VERSION = 1
+MAX_DIST = 32      # Distances are exact up to this; steering only needs the near band
+CLEARANCE = 1.5    # Cells this close to a wall (the first walkable ring) deflect motion
+
+# --- DISTANCE FIELD ---
+def distance_to(mask, cap=MAX_DIST):
+    # Euclidean distance from every cell to the nearest True cell, capped.
+    # Column pass first, then the exact 2D minimum over horizontal offsets.
+    h, w = mask.shape
+    g = np.where(mask, 0.0, cap + 1.0).astype(np.float32)
+    for y in range(1, h): np.minimum(g[y], g[y - 1] + 1, out=g[y])
+    for y in range(h - 2, -1, -1): np.minimum(g[y], g[y + 1] + 1, out=g[y])
+    g2 = g * g
+    d2 = g2.copy()
+    for dx in range(1, min(cap, w - 1) + 1):
+        np.minimum(d2[:, dx:], g2[:, :-dx] + dx * dx, out=d2[:, dx:])
+        np.minimum(d2[:, :-dx], g2[:, dx:] + dx * dx, out=d2[:, :-dx])
+    return np.minimum(np.sqrt(d2), cap)
+
+def steer_field(cells):
+    # (y, x) -> (nx, ny, d): signed distance to the nearest wall (negative inside
+    # walls) and the unit normal pointing away from it. The map border is a wall.
+    pad = np.pad(cells, 1)
+    sdf = (distance_to(~pad) - distance_to(pad))[1:-1, 1:-1]
+    gy, gx = np.gradient(sdf)
+    norm = np.hypot(gx, gy)
+    norm[norm == 0] = 1.0
+    return np.dstack([gx / norm, gy / norm, sdf]).astype(np.float32)
+
+# --- FLOW FIELDS ---
+def flow_field(cells, targets):
+    # Breadth-first wavefront out from the target cells; every walkable cell
+    # then points one step down the distance gradient. Zero on targets and
+    # on cells that can't reach one.
+    h, w = cells.shape
+    W = w + 2
+    free = np.pad(cells, 1).ravel()
+    offsets = np.array([dy * W + dx for dy, dx in STEPS])
+    dist = np.full(free.size, np.iinfo(np.int32).max, dtype=np.int32)
+    frontier = np.flatnonzero(np.pad(targets & cells, 1).ravel())
+    dist[frontier] = 0
+    step = 0
+    while len(frontier):
+        step += 1
+        nb = np.unique((frontier[:, None] + offsets).ravel())
+        nb = nb[free[nb] & (dist[nb] > step)]
+        dist[nb] = step
+        frontier = nb
+
+    grid = dist.reshape(h + 2, W)
+    best = grid[1:-1, 1:-1].copy()
+    flow = np.zeros((h, w, 2), dtype=np.float32)
+    for dy, dx in STEPS:
+        there = grid[1 + dy:h + 1 + dy, 1 + dx:W - 1 + dx]
+        better = there < best
+        best[better] = there[better]
+        flow[better] = np.array([dx, dy]) / math.hypot(dx, dy)
+    flow[~cells] = 0.0
+    return flow
+
+def slide(vx, vy, nx, ny, d):
+    # Velocity near a wall loses its inward part and keeps its speed along the
+    # wall; head-on it turns to follow the wall. Works on scalars and arrays.
+    speed = np.hypot(vx, vy)
+    into = vx * nx + vy * ny
+    hit = (d < CLEARANCE) & (into < 0)
+    sx, sy = vx - np.where(hit, into * nx, 0.0), vy - np.where(hit, into * ny, 0.0)
+    left = np.hypot(sx, sy)
+    head_on = hit & (left < 0.2 * speed)
+    sx, sy = np.where(head_on, -ny, sx), np.where(head_on, nx, sy)
+    left = np.where(head_on, 1.0, np.maximum(left, 1e-9))
+    return sx / left * speed, sy / left * speed
+
+# --- MAP FIELDS ---
+# Per-map steering data, built once and cached on disk as .npy files so later
+# launches can memory-map them.
+class MapFields:
+    def __init__(self, steer, flows):
+        self.steer = steer    # (H, W, 3) float32: nx, ny, signed wall distance
+        self.flows = flows    # destination name -> (H, W, 2) float32 unit steps
+        self.height, self.width = steer.shape[:2]
+
+    @classmethod
+    def build(cls, cells, destinations=None):
+        flows = {name: flow_field(cells, mask) for name, mask in (destinations or {}).items()}
+        return cls(steer_field(cells), flows)
+
+    @classmethod
+    def load_or_build(cls, walk, source=None, size=None, destinations=None):
+        # destinations: name -> bool mask of target cells
+        destinations = destinations or {}
+        if source is None or not os.path.exists(source): return cls.build(walk.cells, destinations)
+        base = file_digest(source, size, walk.cells.shape, FIELD_VERSION)
+        steer = cls.cached(cache_path("steer", base, "npy"), lambda: steer_field(walk.cells))
+        flows = {}
+        for name, mask in destinations.items():
+            key = hashlib.sha1(np.packbits(mask).tobytes()).hexdigest()[:12]
+            path = cache_path(f"flow_{name}", f"{base}_{key}", "npy")
+            flows[name] = cls.cached(path, lambda mask=mask: flow_field(walk.cells, mask))
+        return cls(steer, flows)
+
+    @staticmethod
+    def cached(path, build):
+        data = load_array(path)
+        if data is None:
+            data = build()
+            save_array(path, data)
+        return data
+
+    def cell(self, xs, ys):
+        cx = np.clip(np.asarray(xs).astype(np.intp), 0, self.width - 1)
+        cy = np.clip(np.asarray(ys).astype(np.intp), 0, self.height - 1)
+        return cy, cx
+
+    def steer_at(self, x, y):
+        # Single-agent read: (nx, ny, d) as plain floats
+        cx = min(max(int(x), 0), self.width - 1)
+        cy = min(max(int(y), 0), self.height - 1)
+        return self.steer[cy, cx].tolist()
+
+    def deflect(self, x, y, vx, vy):
+        # Per-agent form of the batched steering in admin (plain floats, since
+        # the scalar scripts call it once per agent): one read where the step
+        # lands, then slide along / step out of the wall found there
+        nx, ny, d = self.steer_at(x + vx, y + vy)
+        if d >= CLEARANCE: return vx, vy
+        into = vx * nx + vy * ny
+        if into < 0:
+            speed = math.hypot(vx, vy)
+            sx, sy = vx - into * nx, vy - into * ny
+            left = math.hypot(sx, sy)
+            if left < 0.2 * speed: sx, sy, left = -ny, nx, 1.0
+            vx, vy = sx / left * speed, sy / left * speed
+        out = max(-d, 0.0)
+        return vx + nx * out, vy + ny * out
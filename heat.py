@@ -0,0 +1,92 @@
+import math
+
+import numpy as np
+import pygame
+
+HEAT_CELL = 10          # World pixels per density cell
+HEAT_RADIUS = 50        # World-space reach of one hostile agent
+HEAT_THRESHOLD = 0.6    # Agents below this hostility add nothing
+HEAT_ALPHA = 90         # Alpha one fully hostile agent contributes
+HEAT_MAX_ALPHA = 170    # Crowds saturate here instead of blacking out the map
+HEAT_COLOR = (255, 0, 0)
+
+# --- HOSTILITY DENSITY FIELD ---
+# Each hostile agent drops an integer weight into the cell it stands in. Only
+# agents whose cell or weight changed since the last update touch the grid,
+# and integer weights mean the running sums never drift. Drawing spreads the
+# grid over a disc of HEAT_RADIUS and upscales it in one blit, so the overlay
+# costs the same for fifty agents as for fifty thousand.
+class HeatField:
+    def __init__(self, width, height, cell=HEAT_CELL, radius=HEAT_RADIUS):
+        self.cell = cell
+        self.cols = int(math.ceil(width / cell))
+        self.rows = int(math.ceil(height / cell))
+        self.reach = max(int(round(radius / cell)), 0)
+        self.spans = [(dy, int(math.sqrt(self.reach ** 2 - dy ** 2))) for dy in range(-self.reach, self.reach + 1)]
+        self.grid = np.zeros(self.rows * self.cols, dtype=np.int64)
+        self.key = np.zeros(0, dtype=np.intp)
+        self.weight = np.zeros(0, dtype=np.int64)
+        self.alpha = np.zeros((self.rows, self.cols), dtype=np.uint8)
+        self.stale = True
+        self.surface = pygame.Surface((self.cols, self.rows), pygame.SRCALPHA)
+        self.surface.fill((*HEAT_COLOR, 0))
+        self.scaled, self.scaled_key = None, None    # Last upscale, reused while nothing changed
+
+    def update(self, xs, ys, hostility):
+        # Call once per frame with the whole population
+        cx = np.clip((xs // self.cell).astype(np.intp), 0, self.cols - 1)
+        cy = np.clip((ys // self.cell).astype(np.intp), 0, self.rows - 1)
+        key = cy * self.cols + cx
+        weight = np.where(hostility > HEAT_THRESHOLD, np.rint(hostility * HEAT_ALPHA), 0).astype(np.int64)
+        if len(key) != len(self.key):
+            # Population changed: start over
+            self.grid[:] = np.bincount(key, weight, self.grid.size).astype(np.int64)
+        else:
+            moved = np.flatnonzero((key != self.key) | (weight != self.weight))
+            if not len(moved): return
+            np.subtract.at(self.grid, self.key[moved], self.weight[moved])
+            np.add.at(self.grid, key[moved], weight[moved])
+        self.key, self.weight = key, weight
+        self.stale = True
+
+    def density(self):
+        # Disc-sum of the grid: one prefix sum per row, then a horizontal span
+        # per disc row, so the cost depends on the grid size and radius only
+        r, rows, cols = self.reach, self.rows, self.cols
+        pad = np.zeros((rows + 2 * r, cols + 2 * r + 1), dtype=np.int64)
+        np.cumsum(np.pad(self.grid.reshape(rows, cols), r), axis=1, out=pad[:, 1:])
+        out = np.zeros((rows, cols), dtype=np.int64)
+        for dy, w in self.spans:
+            band = pad[r + dy:r + dy + rows]
+            out += band[:, r + w + 1:r + w + 1 + cols] - band[:, r - w:r - w + cols]
+        return out
+
+    def refresh(self):
+        if not self.stale: return
+        np.minimum(self.density(), HEAT_MAX_ALPHA, out=self.alpha, casting="unsafe")
+        px = pygame.surfarray.pixels_alpha(self.surface)
+        px[:] = self.alpha.T
+        del px
+        self.stale, self.scaled_key = False, None
+
+    def draw(self, surface, view):
+        # Blits the heated part of view's world rect; returns the screen rect or None
+        self.refresh()
+        c = self.cell
+        vx, vy, vw, vh = view.view
+        c0, r0 = max(vx // c, 0), max(vy // c, 0)
+        c1, r1 = min(-(-(vx + vw) // c), self.cols), min(-(-(vy + vh) // c), self.rows)
+        hot = self.alpha[r0:r1, c0:c1]
+        cols, rows = np.flatnonzero(hot.any(axis=0)), np.flatnonzero(hot.any(axis=1))
+        if not len(cols): return None
+        c0, c1 = c0 + cols[0], c0 + cols[-1] + 1
+        r0, r1 = r0 + rows[0], r0 + rows[-1] + 1
+        x0, y0 = view.to_screen(c0 * c, r0 * c)
+        x1, y1 = view.to_screen(c1 * c, r1 * c)
+        x0, y0 = int(math.floor(x0)), int(math.floor(y0))
+        size = (int(math.ceil(x1)) - x0, int(math.ceil(y1)) - y0)
+        key = (c0, r0, c1, r1, size)
+        if key != self.scaled_key:
+            patch = self.surface.subsurface((c0, r0, c1 - c0, r1 - r0))
+            self.scaled, self.scaled_key = pygame.transform.smoothscale(patch, size), key
+        return surface.blit(self.scaled, (x0, y0))
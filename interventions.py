@@ -0,0 +1,47 @@
+import numpy as np
+
+INTERVENTION_RADIUS = 150   # World pixels an intervention reaches
+
+# kind -> (trust it sets, only agents with the app respond)
+EFFECTS = {
+    "misinfo": (0.0, False),
+    "counter": (1.0, True),
+}
+
+# --- INTERVENTION QUEUE ---
+# Interventions issued during a tick (keys, scripts) wait here and are all
+# applied at the start of the next step by one batched radius query on the
+# spatial grid. With falloff an agent's trust moves towards the target by
+# 1 - dist/radius instead of all the way. Interventions still act in issue
+# order, so overlapping ones end as they would have if applied one by one.
+class InterventionQueue:
+    def __init__(self):
+        self.pending = []   # (kind, x, y, radius, falloff), oldest first
+
+    def __len__(self):
+        return len(self.pending)
+
+    def push(self, kind, x, y, radius=INTERVENTION_RADIUS, falloff=False):
+        if kind not in EFFECTS: raise ValueError(f"unknown intervention: {kind}")
+        self.pending.append((kind, float(x), float(y), float(radius), bool(falloff)))
+
+    def apply(self, grid, trust, has_app):
+        # Empties the queue into trust. Returns (batch, agents reached, index
+        # into batch of the last intervention to reach each of them).
+        batch, self.pending = self.pending, []
+        none = np.empty(0, np.intp)
+        if not batch: return batch, none, none
+        kinds, xs, ys, radii, falloff = zip(*batch)
+        target = np.array([EFFECTS[kind][0] for kind in kinds])
+        app_only = np.array([EFFECTS[kind][1] for kind in kinds])
+        k, i, dist = grid.query_radii(xs, ys, radii)    # Grouped by k, each agent once per k
+        keep = ~app_only[k] | has_app[i]
+        k, i, dist = k[keep], i[keep], dist[keep]
+        weight = np.where(np.array(falloff)[k], 1.0 - dist / np.array(radii)[k], 1.0)
+        bounds = np.searchsorted(k, np.arange(len(batch) + 1))
+        for n, (a, b) in enumerate(zip(bounds[:-1], bounds[1:])):
+            if a < b: trust[i[a:b]] += (target[n] - trust[i[a:b]]) * weight[a:b]
+        last = np.full(len(trust), -1, np.intp)
+        np.maximum.at(last, i, k)
+        hit = np.flatnonzero(last >= 0)
+        return batch, hit, last[hit]
@@ -0,0 +1,150 @@
+import os
+import json
+
+from cache import atomic_write
+
+SEGMENT_BYTES = 1 << 20   # Roll over to a new segment past this size
+INDEX_FILE = "index.json"
+
+def journal_dir_for(state_path):
+    # aegis_state.json -> aegis_state_events/, beside it
+    return os.path.splitext(state_path)[0] + "_events"
+
+def segment_name(n):
+    return f"events-{n:06d}.jsonl"
+
+def write_json(path, data):
+    atomic_write(path, "w", lambda f: json.dump(data, f))
+
+def read_index(root):
+    # [[segment number, seq of its first event], ...], oldest first
+    try:
+        with open(os.path.join(root, INDEX_FILE), "r") as f: return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+# --- EVENT JOURNAL ---
+# Events are appended one JSON line each to the current segment, so writing
+# one costs the same however long the history is. Segments roll over by
+# size and are never rewritten; the index records where each one starts so
+# a reader can find any event by sequence number without scanning them all.
+class EventJournal:
+    def __init__(self, root, segment_bytes=SEGMENT_BYTES):
+        self.root = root
+        self.segment_bytes = segment_bytes
+        os.makedirs(root, exist_ok=True)
+        self.index = read_index(root)
+        if not self.index: self.index = [[0, 0]]
+        self.segment = self.index[-1][0]
+        self.seq = self.index[-1][1] + self.count_lines(self.path(self.segment))
+        self.file = open(self.path(self.segment), "a", encoding="utf-8")
+        write_json(os.path.join(root, INDEX_FILE), self.index)
+
+    def path(self, n):
+        return os.path.join(self.root, segment_name(n))
+
+    @staticmethod
+    def count_lines(path):
+        if not os.path.exists(path): return 0
+        with open(path, "rb") as f: return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 16), b""))
+
+    def append(self, event):
+        # Stamps the event with its sequence number and returns it
+        event = dict(event, seq=self.seq)
+        self.file.write(json.dumps(event) + "\n")
+        self.file.flush()
+        self.seq += 1
+        if self.file.tell() >= self.segment_bytes: self.rotate()
+        return event
+
+    def extend(self, events):
+        # append() for a batch: one write and one flush for all of them
+        events = [dict(e, seq=self.seq + n) for n, e in enumerate(events)]
+        if not events: return events
+        self.file.write("".join(json.dumps(e) + "\n" for e in events))
+        self.file.flush()
+        self.seq += len(events)
+        if self.file.tell() >= self.segment_bytes: self.rotate()
+        return events
+
+    def rotate(self):
+        self.file.close()
+        self.segment += 1
+        self.index.append([self.segment, self.seq])
+        self.file = open(self.path(self.segment), "a", encoding="utf-8")
+        write_json(os.path.join(self.root, INDEX_FILE), self.index)
+
+    def close(self):
+        self.file.close()
+
+# --- TAILING ---
+# Remembers (segment, byte offset) and only ever reads what was appended
+# since. A trailing line without its newline is still being written and is
+# left for the next poll.
+class JournalReader:
+    def __init__(self, root, from_seq=None):
+        # from_seq None: start at the end as it is now and only see events
+        # appended after this. With no journal yet, everything is new.
+        self.root = root
+        self.segment, self.offset = None, 0
+        self.from_seq = from_seq
+        if not self.locate() and from_seq is None: self.from_seq = 0
+
+    def locate(self):
+        index = read_index(self.root)
+        if not index: return False
+        if self.from_seq is None:
+            self.segment = index[-1][0]
+            path = os.path.join(self.root, segment_name(self.segment))
+            self.offset = os.path.getsize(path) if os.path.exists(path) else 0
+        else:
+            self.segment = max((s for s in index if s[1] <= self.from_seq), default=index[0])[0]
+            self.offset = 0
+        return True
+
+    def poll(self):
+        # Events appended since the last call, oldest first
+        if self.segment is None and not self.locate(): return []
+        events = []
+        while True:
+            path = os.path.join(self.root, segment_name(self.segment))
+            try:
+                with open(path, "rb") as f:
+                    f.seek(self.offset)
+                    data = f.read()
+            except OSError:
+                return events
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                try: ev = json.loads(line)
+                except ValueError: continue
+                if self.from_seq is None or ev.get("seq", 0) >= self.from_seq: events.append(ev)
+            self.offset += end
+            # Move on only once the writer has started the next segment
+            if not os.path.exists(os.path.join(self.root, segment_name(self.segment + 1))): return events
+            self.segment, self.offset = self.segment + 1, 0
+
+    def tail(self, n):
+        # The last n events, read backwards through the segments; leaves the
+        # reader positioned at the end
+        index = read_index(self.root)
+        out = []
+        for seg, _ in reversed(index):
+            path = os.path.join(self.root, segment_name(seg))
+            try:
+                with open(path, "rb") as f: lines = f.read().splitlines(keepends=True)
+            except OSError:
+                continue
+            if seg == index[-1][0]:
+                self.segment = seg
+                self.offset = sum(len(l) for l in lines if l.endswith(b"\n"))
+            evs = []
+            for line in lines:
+                if not line.endswith(b"\n"): continue
+                try: evs.append(json.loads(line))
+                except ValueError: pass
+            out = evs[-(n - len(out)):] + out if n > len(out) else out
+            if len(out) >= n: break
+        if self.segment is None and not self.locate(): return out    # Read from the start once it exists
+        self.from_seq = None
+        return out
@@ -1,4 +1,5 @@
 import pygame
+from walkability import WalkGrid
 
 class MapNavigator:
     def __init__(self, filename):
@@ -12,13 +13,14 @@ class MapNavigator:
             
         self.width = self.map_surface.get_width()
         self.height = self.map_surface.get_height()
+        # Walkable = near-white pixel (every channel above 200)
+        self.walk = WalkGrid.from_surface(self.map_surface, min_value=201)
 
     def is_walkable(self, x, y):
-        if 0 <= x < self.width and 0 <= y < self.height:
-            # Check if pixel is white (255, 255, 255)
-            color = self.map_surface.get_at((int(x), int(y)))
-            return color[0] > 200 and color[1] > 200 and color[2] > 200
-        return False
+        return self.walk.is_walkable(x, y)
+
+    def walkable(self, xs, ys):
+        return self.walk.walkable(xs, ys)
 
     def draw(self, screen, offset):
         screen.blit(self.map_surface, offset)
\ No newline at end of file
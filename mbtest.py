@@ -2,6 +2,10 @@ import pygame
 import random
 import math
 import os
+from walkability import WalkGrid, load_map_asset
+from fields import MapFields
+from render import WorldRenderer
+from text import render_text
 
 # --- SETTINGS ---
 WIDTH, HEIGHT = 1150, 750
@@ -36,18 +40,21 @@ class MapHandler:
     def __init__(self):
         self.surface = pygame.Surface((MAP_AREA, HEIGHT))
         self.surface.fill((10, 10, 12))
+        self.source = None
         self.load_map()
-        self.mask = pygame.mask.from_threshold(self.surface, COLOR_WHITE, (10, 10, 10))
+        self.fields = MapFields.load_or_build(self.walk, self.source, (MAP_AREA, HEIGHT))
 
     def load_map(self):
         if os.path.exists("mbmap.png"):
-            img = pygame.image.load("mbmap.png").convert()
-            self.surface = pygame.transform.scale(img, (MAP_AREA, HEIGHT))
+            self.source = "mbmap.png"
+            surface, self.walk = load_map_asset(self.source, (MAP_AREA, HEIGHT))
+            self.surface = surface.convert()
         else:
             for i in range(0, MAP_AREA, 200):
                 pygame.draw.rect(self.surface, COLOR_WHITE, (i, 0, 60, HEIGHT))
             for i in range(0, HEIGHT, 200):
                 pygame.draw.rect(self.surface, COLOR_WHITE, (0, i, MAP_AREA, 60))
+            self.walk = WalkGrid.from_surface(self.surface)
 
 class Agent:
     def __init__(self, id, map_handler):
@@ -67,13 +74,12 @@ class Agent:
     def spawn(self):
         for _ in range(1000):
             rx, ry = random.randint(10, MAP_AREA-10), random.randint(10, HEIGHT-10)
-            if self.mh.mask.get_at((rx, ry)):
+            if self.mh.walk.is_walkable(rx, ry):
                 self.x, self.y = float(rx), float(ry)
                 return
         self.x, self.y = float(MAP_AREA//2), float(HEIGHT//2)
 
     def update(self, is_controlled, agents):
-        old_x, old_y = self.x, self.y
         if is_controlled:
             keys = pygame.key.get_pressed()
             dx, dy = 0, 0
@@ -81,6 +87,7 @@ class Agent:
             if keys[pygame.K_RIGHT]: dx = self.speed
             if keys[pygame.K_UP]: dy = -self.speed
             if keys[pygame.K_DOWN]: dy = self.speed
+            dx, dy = self.mh.fields.deflect(self.x, self.y, dx, dy)
             self.x += dx
             self.y += dy
         else:
@@ -90,13 +97,13 @@ class Agent:
             else:
                 if random.random() < 0.005:
                     self.state = "IDLE"; self.timer = random.randint(30, 90)
+                # Walls turn the agent along them instead of bouncing it back
                 rad = math.radians(self.angle)
-                self.x += math.cos(rad) * self.speed
-                self.y += math.sin(rad) * self.speed
-
-        if not (0 <= self.x < MAP_AREA and 0 <= self.y < HEIGHT) or not self.mh.mask.get_at((int(self.x), int(self.y))):
-            self.x, self.y = old_x, old_y
-            self.angle = random.choice([0, 90, 180, 270])
+                vx, vy = math.cos(rad) * self.speed, math.sin(rad) * self.speed
+                dx, dy = self.mh.fields.deflect(self.x, self.y, vx, vy)
+                if (dx, dy) != (vx, vy): self.angle = math.degrees(math.atan2(dy, dx))
+                self.x += dx
+                self.y += dy
 
         for other in agents:
             if other == self: continue
@@ -138,6 +145,7 @@ class Simulation:
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN | pygame.SCALED)
         self.mh = MapHandler()
         self.camera = Camera()
+        self.layers = WorldRenderer(self.mh.surface, (MAP_AREA, HEIGHT))
         self.agents = [Agent(i, self.mh) for i in range(AGENT_COUNT)]
         self.selected = None
         self.logs = ["Aegis Online...", "Protocol: Surveillance"]
@@ -153,22 +161,25 @@ class Simulation:
         if len(self.logs) > 18: self.logs.pop(0)
 
     def draw(self):
-        # 1. Render World to a Surface
-        world_surf = pygame.Surface((MAP_AREA, HEIGHT))
-        world_surf.blit(self.mh.surface, (0,0))
+        # 1. Cached, pre-zoomed map layer (run() clears the whole screen every frame)
+        zoom = self.camera.zoom
+        view = self.layers
+        view.invalidate()
+        view.begin(self.screen, pygame.Rect(self.camera.x, self.camera.y, int(MAP_AREA / zoom), int(HEIGHT / zoom)))
+
+        # 2. Agents straight in screen space
+        scale = view.scale[0]
+        cull = view.visible(10)  # Agent radius plus the app ring
         for a in self.agents:
+            if not cull.collidepoint(a.x, a.y): continue
             r = clamp_color(255 * a.hostility)
             g = clamp_color(255 * (1 - a.hostility))
-            pygame.draw.circle(world_surf, (r, g, 50), (int(a.x), int(a.y)), a.radius)
-            if a.has_app: pygame.draw.circle(world_surf, COLOR_WHITE, (int(a.x), int(a.y)), a.radius+2, 1)
-
-        # 2. Camera Transform
-        zoom = self.camera.zoom
-        view_w, view_h = int(MAP_AREA / zoom), int(HEIGHT / zoom)
-        sub_rect = pygame.Rect(self.camera.x, self.camera.y, view_w, view_h)
-        view_surf = world_surf.subsurface(sub_rect)
-        scaled_view = pygame.transform.scale(view_surf, (MAP_AREA, HEIGHT))
-        self.screen.blit(scaled_view, (0, 0))
+            x, y = view.to_screen(a.x, a.y)
+            pos = (int(x), int(y))
+            pygame.draw.circle(self.screen, (r, g, 50), pos, max(int(a.radius * scale), 1))
+            if a.has_app: pygame.draw.circle(self.screen, COLOR_WHITE, pos, int((a.radius+2) * scale), max(int(scale), 1))
+        self.screen.set_clip(None)
+        view.end()
 
         # 3. UI and Eye
         self.draw_ui()
@@ -182,16 +193,15 @@ class Simulation:
     def draw_ui(self):
         pygame.draw.rect(self.screen, COLOR_UI_PANEL, (MAP_AREA, 0, UI_WIDTH, 320))
         pygame.draw.rect(self.screen, (5, 5, 10), (MAP_AREA, 322, UI_WIDTH, HEIGHT - 322))
-        f_std = pygame.font.SysFont("Courier", 14)
         if self.selected:
             h_val = self.selected.hostility
             h_col = (clamp_color(255*h_val), clamp_color(255*(1-h_val)), 0)
-            self.screen.blit(f_std.render(f"ID: {self.selected.id:03d}", True, COLOR_ACCENT), (MAP_AREA+20, 40))
+            self.screen.blit(render_text(f"ID: {self.selected.id:03d}", COLOR_ACCENT), (MAP_AREA+20, 40))
             pygame.draw.rect(self.screen, h_col, (MAP_AREA+20, 100, int(200*h_val), 10))
-            self.screen.blit(f_std.render(f"ACTIVITY: {self.selected.activity}", True, COLOR_WHITE), (MAP_AREA+20, 140))
+            self.screen.blit(render_text(f"ACTIVITY: {self.selected.activity}", COLOR_WHITE), (MAP_AREA+20, 140))
         for i, log in enumerate(reversed(self.logs)):
             color = COLOR_ACCENT if i == 0 else (130, 130, 130)
-            self.screen.blit(f_std.render(f"> {log}", True, color), (MAP_AREA+15, HEIGHT - 30 - (i * 20)))
+            self.screen.blit(render_text(f"> {log}", color), (MAP_AREA+15, HEIGHT - 30 - (i * 20)))
 
     def run(self):
         while True:
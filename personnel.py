@@ -0,0 +1,158 @@
+import os
+import hmac
+import json
+import hashlib
+import argparse
+import threading
+
+from cache import atomic_write
+
+USERS_FILE = "users.json"
+HASH_ITERATIONS = 100_000   # For hashes written by --hash
+WATCH_SECONDS = 2.0         # start() re-checks the file this often
+
+def hash_password(password, salt=None, iterations=HASH_ITERATIONS):
+    # "pbkdf2_sha256$iterations$salt$digest", hex encoded
+    salt = salt or os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${salt.hex()}${digest.hex()}"
+
+def check_password(stored, password):
+    try:
+        scheme, iterations, salt, digest = stored.split("$")
+        if scheme != "pbkdf2_sha256": return False
+        got = hashlib.pbkdf2_hmac("sha256", password.encode(), bytes.fromhex(salt), int(iterations))
+    except (AttributeError, ValueError):
+        return False
+    return hmac.compare_digest(got, bytes.fromhex(digest))
+
+# --- PERSONNEL DIRECTORY ---
+# users.json parsed once into hash indexes by username and clearance, with
+# salted password hashes in place of the plaintext. Records still holding a
+# plaintext password are hashed in memory with keyed BLAKE2b (a per-process
+# key, the username as salt), cheap enough that a large legacy roster still
+# loads quickly; `--hash` rewrites the file with PBKDF2 hashes. refresh()
+# is one stat() unless the file changed; a changed file is re-read, but
+# records that are the same as before keep their entries. Each reload swaps
+# the whole index under a lock and bumps .version, so start() can keep the
+# roster current from a background thread; concurrent refresh() calls are
+# serialized, so only one of them ever reloads.
+class PersonnelDirectory:
+    def __init__(self, path=USERS_FILE):
+        self.path = path
+        self.stamp = None
+        self.by_name = {}        # username -> public profile (no password)
+        self.hashes = {}         # username -> stored password hash
+        self.by_clearance = {}   # clearance -> set of usernames
+        self.names = []          # Usernames in file order
+        self.seen = {}           # username -> hash() of its record, to spot edits
+        self.key = os.urandom(16)
+        self.dummy = None        # Checked for unknown usernames, so they take as long as known ones
+        self.slow_dummy = None   # PBKDF2 at HASH_ITERATIONS, made the first time a roster has such records
+        self.error = None
+        self.version = 0         # Bumped on every successful (re)load
+        self.lock = threading.Lock()
+        self.reloading = threading.Lock()    # Held for the whole of refresh()
+        self.stop_flag = threading.Event()
+        self.refresh()
+
+    def start(self, interval=WATCH_SECONDS):
+        def loop():
+            while not self.stop_flag.wait(interval): self.refresh()
+        threading.Thread(target=loop, name="personnel", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stop_flag.set()
+
+    @property
+    def loaded(self):
+        return self.stamp is not None
+
+    def __len__(self):
+        return len(self.names)
+
+    def refresh(self):
+        # True when the roster was (re)loaded
+        with self.reloading: return self.reload()
+
+    def reload(self):
+        try: st = os.stat(self.path)
+        except OSError: return False
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp == self.stamp: return False
+        self.stamp = stamp
+        try:
+            with open(self.path, "r") as f: records = json.load(f)["authorized_personnel"]
+            self.load(records)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.error = f"{type(e).__name__}: {e}"    # Keep the last good roster
+            return False
+        self.error = None
+        return True
+
+    def load(self, records):
+        by_name, hashes, seen, names = {}, {}, {}, []
+        for rec in records:
+            name = rec["username"]
+            if name in by_name: continue    # First entry wins, as the old linear scan did
+            names.append(name)
+            seen[name] = fp = hash(tuple(rec.items()))
+            if self.seen.get(name) == fp:
+                by_name[name], hashes[name] = self.by_name[name], self.hashes[name]
+                continue
+            by_name[name] = {"username": name, "role": rec.get("role", ""), "clearance": rec.get("clearance", "")}
+            hashes[name] = rec["password_hash"] if "password_hash" in rec else self.legacy_digest(name, str(rec.get("password", "")))
+        by_clearance = {}
+        for name, p in by_name.items(): by_clearance.setdefault(p["clearance"], set()).add(name)
+        # The slowest check any known name can get, so an unknown one can't be told apart
+        if any(isinstance(h, str) for h in hashes.values()):
+            if self.slow_dummy is None: self.slow_dummy = hash_password(os.urandom(16).hex())
+            dummy = self.slow_dummy
+        else:
+            dummy = next(iter(hashes.values()), None)
+        with self.lock:
+            self.by_name, self.hashes, self.by_clearance, self.names, self.seen = by_name, hashes, by_clearance, names, seen
+            self.dummy = dummy
+            self.version += 1
+
+    def roster(self):
+        # (usernames in file order, profiles by username, version), all from one load
+        with self.lock: return self.names, self.by_name, self.version
+
+    def legacy_digest(self, username, password):
+        return hashlib.blake2b(f"{username}\0{password}".encode(), key=self.key, digest_size=32).digest()
+
+    def matches(self, stored, username, password):
+        if isinstance(stored, bytes): return hmac.compare_digest(stored, self.legacy_digest(username, password))
+        return check_password(stored, password)
+
+    def get(self, username):
+        return self.by_name.get(username)
+
+    def with_clearance(self, clearance):
+        return self.by_clearance.get(clearance, set())
+
+    def verify(self, username, password):
+        # The public profile when the password matches, else None
+        stored = self.hashes.get(username)
+        if stored is None:
+            if self.dummy is not None: self.matches(self.dummy, username, password or "")
+            return None
+        return self.by_name.get(username) if self.matches(stored, username, password or "") else None
+
+def hash_file(path=USERS_FILE):
+    # Rewrites users.json with salted hashes in place of plaintext passwords
+    with open(path, "r") as f: data = json.load(f)
+    for rec in data["authorized_personnel"]:
+        if "password" in rec: rec["password_hash"] = hash_password(str(rec.pop("password")))
+    lines = ",\n".join("    " + json.dumps(rec) for rec in data["authorized_personnel"])
+    atomic_write(path, "w", lambda f: f.write('{\n  "authorized_personnel": [\n' + lines + "\n  ]\n}\n"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aegis personnel file tools")
+    parser.add_argument("--hash", action="store_true", help="replace plaintext passwords with salted hashes")
+    parser.add_argument("path", nargs="?", default=USERS_FILE)
+    args = parser.parse_args()
+    if args.hash: hash_file(args.path)
+    else: parser.print_help()
@@ -0,0 +1,99 @@
+import numpy as np
+
+RADICAL_TRUST = 0.3   # Below this an agent counts as radicalized
+TRUST_BINS = 10       # Histogram buckets over [0, 1]
+TRUST_SCALE = 1 << 20 # Trust is summed in fixed point, so the running total never drifts
+HISTORY = 300         # Samples kept for trend lines
+SAMPLE_TICKS = 60     # Ticks between samples (1 s at 60 FPS, so 5 minutes of history)
+TREND_FIELDS = ("tick", "trust", "radicalized", "app_trust", "offline_trust")
+
+def fixed(trust):
+    return np.rint(np.clip(trust, 0.0, 1.0) * TRUST_SCALE).astype(np.int64)
+
+def bucket(trust):
+    return np.minimum((np.asarray(trust) * TRUST_BINS).astype(np.intp), TRUST_BINS - 1)
+
+# --- POPULATION AGGREGATES ---
+# Radicalized count, trust total and a trust histogram, each split by
+# has_app, kept as running sums. Whoever changes trust passes the agents it
+# touched to update(), which takes their old contribution out and puts the
+# new one in, so reading the dashboard numbers costs nothing however large
+# the population. Integer sums mean the totals always match a recount.
+# sample() appends the current numbers to fixed-size ring buffers for trend
+# lines.
+class PopulationStats:
+    def __init__(self, trust, has_app, history=HISTORY):
+        self.trust = trust    # The live array; update() reads new values from it
+        self.app = np.asarray(has_app).astype(np.intp)    # Row 1 has the app, row 0 does not
+        self.members = np.bincount(self.app, minlength=2)
+        self.trend = np.zeros((history, len(TREND_FIELDS)))
+        self.hist_trend = np.zeros((history, 2, TRUST_BINS), np.int32)
+        self.head = self.filled = 0
+        self.samples = 0      # Bumped by sample(), for redrawing charts only when it moves
+        self.recount()
+
+    def recount(self):
+        # Full pass; for after trust was written without update()
+        self.q = fixed(self.trust)
+        self.bin = bucket(self.trust)
+        self.radical = self.trust < RADICAL_TRUST
+        self.hist = np.bincount(self.app * TRUST_BINS + self.bin, minlength=2 * TRUST_BINS).reshape(2, TRUST_BINS)
+        self.totals = np.array([int(self.q[self.app == r].sum()) for r in (0, 1)], np.int64)
+        self.radicals = np.bincount(self.app, self.radical, 2).astype(np.int64)
+
+    def update(self, idx):
+        # idx: agents whose trust may have changed; repeats are fine
+        idx = np.unique(idx)
+        if not len(idx): return
+        t, row = self.trust[idx], self.app[idx]
+        q, b, r = fixed(t), bucket(t), t < RADICAL_TRUST
+        self.totals += np.bincount(row, q - self.q[idx], 2).astype(np.int64)
+        self.radicals += np.bincount(row, r.astype(np.int64) - self.radical[idx], 2).astype(np.int64)
+        self.hist += (np.bincount(row * TRUST_BINS + b, minlength=2 * TRUST_BINS) -
+                      np.bincount(row * TRUST_BINS + self.bin[idx], minlength=2 * TRUST_BINS)).reshape(2, TRUST_BINS)
+        self.q[idx], self.bin[idx], self.radical[idx] = q, b, r
+
+    @property
+    def count(self):
+        return int(self.members.sum())
+
+    @property
+    def radicalized(self):
+        return int(self.radicals.sum())
+
+    @property
+    def mean_trust(self):
+        return float(self.totals.sum()) / TRUST_SCALE / max(self.count, 1)
+
+    def group_trust(self, app):
+        # Mean trust of agents with (True) or without (False) the app
+        r = int(app)
+        return float(self.totals[r]) / TRUST_SCALE / max(int(self.members[r]), 1)
+
+    def sample(self, tick):
+        self.trend[self.head] = (tick, self.mean_trust, self.radicalized, self.group_trust(True), self.group_trust(False))
+        self.hist_trend[self.head] = self.hist
+        self.head = (self.head + 1) % len(self.trend)
+        self.filled = min(self.filled + 1, len(self.trend))
+        self.samples += 1
+
+    def history(self, n=None):
+        # The last n samples (all by default), oldest first, as
+        # (trend rows in TREND_FIELDS order, histograms)
+        n = self.filled if n is None else min(n, self.filled)
+        order = np.arange(self.head - n, self.head) % len(self.trend)
+        return self.trend[order], self.hist_trend[order]
+
+    def summary(self, trend=True):
+        # JSON-ready numbers for snapshots and the terminal feed
+        out = {
+            "agents": self.count,
+            "radicalized": self.radicalized,
+            "trust": round(self.mean_trust, 4),
+            "app_agents": int(self.members[1]),
+            "app_trust": round(self.group_trust(True), 4),
+            "offline_trust": round(self.group_trust(False), 4),
+            "hist": self.hist.tolist(),    # [without app, with app], TRUST_BINS each
+        }
+        if trend: out["trend"] = [[int(s[0]), round(s[1], 4), int(s[2]), round(s[3], 4), round(s[4], 4)] for s in self.history()[0].tolist()]
+        return out
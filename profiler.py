@@ -0,0 +1,114 @@
+import csv
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pygame
+
+from text import get_font
+
+FRAME_BUDGET_MS = 1000.0 / 60
+
+# --- FRAME PROFILER ---
+# Accumulates wall time per named phase for the current frame, keeps a rolling
+# window of past frames and forwards every finished frame to registered sinks.
+class FrameProfiler:
+    def __init__(self, phases, history=240, budget_ms=FRAME_BUDGET_MS):
+        self.phases = tuple(phases)
+        self.budget_ms = budget_ms
+        self.history = {p: deque(maxlen=history) for p in self.phases}
+        self.totals = deque(maxlen=history)
+        self.current = dict.fromkeys(self.phases, 0.0)
+        self.sinks = []
+        self.frame = 0
+        self.visible = False
+        self.font = None
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try: yield
+        finally: self.current[name] += (time.perf_counter() - start) * 1000.0
+
+    def add_sink(self, sink):
+        # sink(frame_no, {phase: ms}) is called once per finished frame
+        self.sinks.append(sink)
+
+    def end_frame(self):
+        timings = self.current
+        for p in self.phases: self.history[p].append(timings[p])
+        self.totals.append(sum(timings.values()))
+        for sink in self.sinks: sink(self.frame, timings)
+        self.current = dict.fromkeys(self.phases, 0.0)
+        self.frame += 1
+
+    def over_budget(self):
+        # Phases that alone blew the frame budget somewhere in the window
+        return [p for p in self.phases if self.history[p] and max(self.history[p]) > self.budget_ms]
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    def draw_overlay(self, surface, x, y, width=320, row_h=26):
+        # Returns the panel rect it drew over, or None when hidden
+        if not self.visible or not self.totals: return None
+        if self.font is None: self.font = get_font(12)
+        rows = (*self.phases, "frame")
+        panel = pygame.Rect(x, y, width, 10 + row_h * len(rows))
+        shade = pygame.Surface(panel.size, pygame.SRCALPHA)
+        shade.fill((0, 0, 0, 190))
+        surface.blit(shade, panel.topleft)
+        pygame.draw.rect(surface, (0, 255, 180), panel, 1)
+
+        graph_x, graph_w = x + 150, width - 158
+        for r, name in enumerate(rows):
+            samples = self.totals if name == "frame" else self.history[name]
+            top = y + 6 + r * row_h
+            values = np.fromiter(samples, dtype=float)
+            hot = values.max() > self.budget_ms
+            color = (255, 45, 45) if hot else (0, 255, 180)
+            label = f"{name[:10]:<10} {values[-1]:5.1f}"
+            surface.blit(self.font.render(label, True, color), (x + 6, top + 4))
+
+            # Rolling bar graph, full height = one frame budget
+            shown = values[-graph_w:]
+            heights = np.minimum(shown / self.budget_ms, 1.0) * (row_h - 6)
+            base = top + row_h - 4
+            for i, h in enumerate(heights.tolist()):
+                if h >= 1: pygame.draw.line(surface, color, (graph_x + i, base), (graph_x + i, base - int(h)))
+        return panel
+
+class CsvSink:
+    # Streams one row per frame: frame number then one column per phase (ms)
+    def __init__(self, path, phases):
+        self.file = open(path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.phases = tuple(phases)
+        self.writer.writerow(("frame", *self.phases))
+
+    def __call__(self, frame, timings):
+        self.writer.writerow((frame, *(f"{timings[p]:.3f}" for p in self.phases)))
+
+    def close(self):
+        self.file.close()
+
+class RingBufferSink:
+    # Fixed-size in-memory capture for later analysis: rows are frames, columns phases
+    def __init__(self, size, phases):
+        self.phases = tuple(phases)
+        self.data = np.zeros((size, len(self.phases)))
+        self.frames = np.full(size, -1, dtype=np.int64)
+        self.count = 0
+
+    def __call__(self, frame, timings):
+        slot = self.count % len(self.frames)
+        self.data[slot] = [timings[p] for p in self.phases]
+        self.frames[slot] = frame
+        self.count += 1
+
+    def snapshot(self):
+        # Oldest first
+        order = np.argsort(self.frames)
+        keep = order[self.frames[order] >= 0]
+        return self.frames[keep], self.data[keep]
@@ -0,0 +1,82 @@
+import pygame
+
+MAX_DIRTY_RECTS = 400    # More patches than this and one full blit is cheaper
+MAX_DIRTY_SHARE = 0.5    # Same when the patches cover this much of the view
+
+def merge_rects(rects):
+    # Coalesces overlapping rects until none overlap; the result covers them all.
+    # Needed wherever a translucent layer is blitted patch by patch.
+    out = []
+    for r in rects:
+        r = pygame.Rect(r)
+        hits = r.collidelistall(out)
+        while hits:
+            for k in reversed(hits): r.union_ip(out.pop(k))
+            hits = r.collidelistall(out)
+        out.append(r)
+    return out
+
+# --- LAYERED WORLD RENDERER ---
+# The static map, already cropped and scaled for the current camera view, is
+# cached in its own layer. Heat, effects and agents are drawn on top in screen
+# space every frame. While the view is unchanged only the patches drawn over
+# last frame are restored from the cache, and only those plus this frame's
+# patches need presenting.
+class WorldRenderer:
+    def __init__(self, static, size):
+        self.static = static    # World-space map (anything that never moves)
+        self.size = size
+        self.layer = pygame.Surface(size, 0, static)
+        self.bounds = pygame.Rect(0, 0, *size)
+        self.view = None
+        self.origin, self.scale = (0, 0), (1.0, 1.0)
+        self.prev, self.drawn = [], []
+        self.full = True
+
+    def set_view(self, rect):
+        # rect: world-space area shown; the cached layer is only rebuilt when it moves
+        rect = pygame.Rect(rect).clamp(self.static.get_rect())
+        if rect == self.view: return
+        self.view = rect
+        pygame.transform.scale(self.static.subsurface(rect), self.size, self.layer)
+        self.origin = rect.topleft
+        self.scale = (self.size[0] / rect.w, self.size[1] / rect.h)
+        self.full = True
+
+    def invalidate(self):
+        # Something else drew over the whole view (or the static map changed)
+        self.full = True
+
+    def visible(self, margin=0):
+        # World rect worth drawing into: the view plus margin world pixels,
+        # enough for anything centred just outside to still reach the edge
+        return self.view.inflate(2 * margin, 2 * margin)
+
+    def to_screen(self, x, y):
+        # Works on scalars and NumPy arrays alike
+        return (x - self.origin[0]) * self.scale[0], (y - self.origin[1]) * self.scale[1]
+
+    def begin(self, screen, rect):
+        # Leaves screen clipped to the view; the caller resets the clip when done
+        self.set_view(rect)
+        area = sum(r.w * r.h for r in self.prev)
+        if len(self.prev) > MAX_DIRTY_RECTS or area > MAX_DIRTY_SHARE * self.size[0] * self.size[1]:
+            self.full = True
+        if self.full: screen.blit(self.layer, (0, 0))
+        else:
+            for r in self.prev: screen.blit(self.layer, r, r)
+        screen.set_clip(self.bounds)
+        self.drawn = []
+
+    def mark(self, rect):
+        # Register a patch drawn over the view (pygame.draw.* and blit return one)
+        if len(self.drawn) > MAX_DIRTY_RECTS: return
+        rect = self.bounds.clip(rect)
+        if rect.w and rect.h: self.drawn.append(rect)
+
+    def end(self):
+        # Rects to present this frame, or None when the whole view must be
+        if self.full or len(self.drawn) > MAX_DIRTY_RECTS: updates = None
+        else: updates = self.prev + self.drawn
+        self.prev, self.full = self.drawn, False
+        return updates
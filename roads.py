@@ -0,0 +1,286 @@
+import os
+import heapq
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from cache import file_digest, cache_path, atomic_write
+
+GRAPH_VERSION = 1
+SPUR_LENGTH = 15        # Dead-end edges shorter than this are thinning noise
+WAYPOINT_STEP = 12      # Longest straight run between stored waypoints
+MIN_COMPONENT = 3       # Smallest separate road network worth keeping (nodes)
+PATH_CACHE_SIZE = 4096  # Waypoint arrays kept; a miss only walks a cached tree
+TREE_CACHE_SIZE = 1024  # Shortest-path trees kept, two int32 per node each
+
+# (dy, dx) with the 4-connected steps first so tracing prefers straight moves
+STEPS = ((0, 1), (1, 0), (0, -1), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+# --- SKELETON ---
+def skeletonize(cells):
+    # Zhang-Suen thinning, each sub-iteration vectorized over the whole grid
+    img = np.pad(cells, 1).astype(np.uint8)
+    changed = True
+    while changed:
+        changed = False
+        for first in (True, False):
+            c = img[1:-1, 1:-1]
+            p2, p3, p4, p5 = img[:-2, 1:-1], img[:-2, 2:], img[1:-1, 2:], img[2:, 2:]
+            p6, p7, p8, p9 = img[2:, 1:-1], img[2:, :-2], img[1:-1, :-2], img[:-2, :-2]
+            ring = (p2, p3, p4, p5, p6, p7, p8, p9, p2)
+            b = p2 + p3 + p4 + p5 + p6 + p7 + p8 + p9
+            a = sum(((ring[k] == 0) & (ring[k + 1] == 1)).astype(np.uint8) for k in range(8))
+            if first: side = (p2 * p4 * p6 == 0) & (p4 * p6 * p8 == 0)
+            else: side = (p2 * p4 * p8 == 0) & (p2 * p6 * p8 == 0)
+            strip = (c == 1) & (b >= 2) & (b <= 6) & (a == 1) & side
+            if strip.any():
+                c[strip] = 0
+                changed = True
+    return img[1:-1, 1:-1].astype(bool)
+
+def extract_graph(skel):
+    # Nodes are clusters of skeleton pixels that aren't plain corridor pixels
+    # (ends and junctions); edges are the corridors traced between them.
+    pad = np.pad(skel, 1)
+    h, w = pad.shape
+    flat = pad.ravel()
+    offsets = [dy * w + dx for dy, dx in STEPS]
+    count = np.zeros(pad.shape, dtype=np.uint8)
+    for dy, dx in STEPS:
+        count[1:-1, 1:-1] += pad[1 + dy:h - 1 + dy, 1 + dx:w - 1 + dx]
+    on = set(np.flatnonzero(flat).tolist())
+    node_pix = np.flatnonzero(flat & (count.ravel() != 2)).tolist()
+    is_node = set(node_pix)
+
+    node_of, clusters = {}, []
+    for p in node_pix:
+        if p in node_of: continue
+        cid = len(clusters)
+        node_of[p] = cid
+        stack, members = [p], []
+        while stack:
+            q = stack.pop()
+            members.append(q)
+            for o in offsets:
+                r = q + o
+                if r in is_node and r not in node_of:
+                    node_of[r] = cid; stack.append(r)
+        clusters.append(members)
+    # Each node sits on the member pixel closest to its cluster's centre
+    nodes = []
+    for ms in clusters:
+        xs, ys = np.array(ms) % w - 1, np.array(ms) // w - 1
+        k = np.argmin(np.hypot(xs - xs.mean(), ys - ys.mean()))
+        nodes.append((xs[k], ys[k]))
+    nodes = np.array(nodes, dtype=float)
+
+    visited, edges = set(), []
+    for p, c in list(node_of.items()):
+        for o in offsets:
+            q = p + o
+            if q not in on or q in node_of or q in visited: continue
+            visited.add(q)
+            path, prev, cur, end = [q], p, q, None
+            while end is None:
+                nxt = None
+                for o2 in offsets:
+                    r = cur + o2
+                    if r == prev or r not in on: continue
+                    if r in node_of:
+                        if node_of[r] != c or len(path) > 2: end = node_of[r]; break
+                    elif nxt is None and r not in visited: nxt = r
+                if end is not None or nxt is None: break
+                visited.add(nxt); path.append(nxt)
+                prev, cur = cur, nxt
+            if end is not None and end != c:
+                edges.append((c, end, [(q % w - 1, q // w - 1) for q in path]))
+    return nodes, edges
+
+def components(count, pairs):
+    # Connected component id per node (-1 for nodes without edges)
+    adj = [[] for _ in range(count)]
+    for u, v in pairs: adj[u].append(v); adj[v].append(u)
+    comp = np.full(count, -1, dtype=np.int32)
+    label = 0
+    for s in range(count):
+        if comp[s] >= 0 or not adj[s]: continue
+        comp[s], stack = label, [s]
+        while stack:
+            for v in adj[stack.pop()]:
+                if comp[v] < 0: comp[v] = label; stack.append(v)
+        label += 1
+    return comp
+
+def prune(nodes, edges):
+    # Drops short dead-end spurs and road fragments too small to travel on
+    for _ in range(2):
+        degree = np.zeros(len(nodes), dtype=int)
+        for u, v, _ in edges: degree[u] += 1; degree[v] += 1
+        edges = [e for e in edges if not (min(degree[e[0]], degree[e[1]]) == 1 and len(e[2]) < SPUR_LENGTH)]
+
+    comp = components(len(nodes), [(u, v) for u, v, _ in edges])
+    sizes = np.bincount(comp[comp >= 0])
+    keep = np.flatnonzero((comp >= 0) & (sizes[np.maximum(comp, 0)] >= MIN_COMPONENT))
+    remap = {old: new for new, old in enumerate(keep.tolist())}
+    edges = [(remap[u], remap[v], path) for u, v, path in edges if u in remap]
+    return nodes[keep], edges
+
+def clear_line(cells, a, b):
+    n = int(math.ceil(3 * math.hypot(b[0] - a[0], b[1] - a[1]))) + 1
+    xs = np.linspace(a[0], b[0], n).astype(np.intp)
+    ys = np.linspace(a[1], b[1], n).astype(np.intp)
+    return bool(cells[ys, xs].all())
+
+def simplify(cells, pts):
+    # Greedy: keep a corridor pixel only where a straight run from the last
+    # kept point would leave the road or grow past WAYPOINT_STEP
+    keep, anchor = [], 0
+    for i in range(1, len(pts) - 1):
+        nxt = pts[i + 1]
+        far = math.hypot(nxt[0] - pts[anchor][0], nxt[1] - pts[anchor][1]) > WAYPOINT_STEP
+        if far or not clear_line(cells, pts[anchor], nxt):
+            keep.append(pts[i]); anchor = i
+    return keep
+
+# --- ROAD GRAPH ---
+class RoadGraph:
+    def __init__(self, nodes, edge_uv, edge_len, poly, poly_start):
+        self.nodes = np.asarray(nodes, dtype=float)
+        self.node_list = self.nodes.tolist()
+        self.edge_uv = np.asarray(edge_uv, dtype=np.int32).reshape(-1, 2)
+        self.edge_len = np.asarray(edge_len, dtype=float)
+        self.poly = np.asarray(poly, dtype=float).reshape(-1, 2)
+        self.poly_start = np.asarray(poly_start, dtype=np.int64)
+        self.adj = [[] for _ in range(len(self.nodes))]
+        for e, (u, v) in enumerate(self.edge_uv.tolist()):
+            self.adj[u].append((v, float(self.edge_len[e]), e))
+            self.adj[v].append((u, float(self.edge_len[e]), e))
+        # Every stored road point, tagged with the edge it lies on
+        self.point_edge = np.repeat(np.arange(len(self.edge_uv)), np.diff(self.poly_start))
+        # Disconnected networks: destinations are drawn from the traveller's own
+        self.component = components(len(self.nodes), self.edge_uv.tolist())
+        self.members = [np.flatnonzero(self.component == c) for c in range(self.component.max() + 1)]
+        self.trees = OrderedDict()    # dest -> (next node, edge taken) per node, toward dest
+        # Each edge's road points plus the junction it ends at, both ways round
+        self.legs = {}
+        for e, (u, v) in enumerate(self.edge_uv.tolist()):
+            self.legs[e, u] = np.concatenate([self.edge_points(e, u), self.nodes[[v]]])
+            self.legs[e, v] = np.concatenate([self.edge_points(e, v), self.nodes[[u]]])
+        self.path_cache = OrderedDict()
+        self.hits = self.misses = 0
+
+    @classmethod
+    def build(cls, cells):
+        nodes, edges = prune(*extract_graph(skeletonize(cells)))
+        edge_uv, edge_len, poly, poly_start = [], [], [], [0]
+        # Pixel centres, so truncating a waypoint lands back on its road pixel
+        for u, v, path in edges:
+            pts = [tuple(nodes[u] + 0.5), *((x + 0.5, y + 0.5) for x, y in path), tuple(nodes[v] + 0.5)]
+            edge_uv.append((u, v))
+            edge_len.append(float(np.hypot(*np.diff(np.array(pts), axis=0).T).sum()))
+            poly.extend(simplify(cells, pts))
+            poly_start.append(len(poly))
+        return cls(nodes + 0.5, edge_uv, edge_len, poly, poly_start)
+
+    @classmethod
+    def load_or_build(cls, walk, source=None, size=None):
+        # Cached on disk keyed by the source image hash and the grid it was scaled to
+        if source is None or not os.path.exists(source): return cls.build(walk.cells)
+        path = cache_path("roads", file_digest(source, size, walk.cells.shape, GRAPH_VERSION), "npz")
+        if os.path.exists(path):
+            with np.load(path) as d:
+                return cls(d["nodes"], d["edge_uv"], d["edge_len"], d["poly"], d["poly_start"])
+        graph = cls.build(walk.cells)
+        graph.save(path)
+        return graph
+
+    def save(self, path):
+        atomic_write(path, "wb", lambda f: np.savez(f, nodes=self.nodes, edge_uv=self.edge_uv, edge_len=self.edge_len,
+                                                    poly=self.poly, poly_start=self.poly_start))
+
+    def edge_points(self, e, from_node):
+        pts = self.poly[self.poly_start[e]:self.poly_start[e + 1]]
+        return pts if self.edge_uv[e, 0] == from_node else pts[::-1]
+
+    def tree(self, b):
+        # Shortest-path tree into b: one Dijkstra per destination, kept in an
+        # LRU, so every later route to b from anywhere is a table walk
+        t = self.trees.get(b)
+        if t is not None:
+            self.trees.move_to_end(b)
+            return t
+        hop = np.full(len(self.nodes), -1, dtype=np.int32)
+        via = np.full(len(self.nodes), -1, dtype=np.int32)
+        best = {b: 0.0}
+        heap = [(0.0, b)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > best[u]: continue
+            for v, length, e in self.adj[u]:
+                cost = d + length
+                if cost < best.get(v, math.inf):
+                    best[v] = cost
+                    hop[v], via[v] = u, e
+                    heapq.heappush(heap, (cost, v))
+        t = self.trees[b] = (hop, via)
+        if len(self.trees) > TREE_CACHE_SIZE: self.trees.popitem(last=False)
+        return t
+
+    def find_path(self, a, b):
+        # Shortest path over intersections; returns [(node, edge used to reach it), ...]
+        if a == b: return []
+        hop, via = self.tree(b)
+        if hop[a] < 0: return None
+        steps, n = [], a
+        while n != b:
+            steps.append((int(hop[n]), int(via[n])))
+            n = steps[-1][0]
+        return steps
+
+    def route(self, a, b):
+        # Waypoints from node a to node b; recent ones are kept as arrays
+        key = (a, b)
+        cached = self.path_cache.get(key)
+        if cached is not None:
+            self.path_cache.move_to_end(key)
+            self.hits += 1
+            return cached
+        self.misses += 1
+        steps = self.find_path(a, b)
+        if steps is None: waypoints = self.nodes[[a]]
+        else:
+            parts, at = [self.nodes[[a]]], a
+            for n, e in steps:
+                parts.append(self.legs[e, at])
+                at = n
+            waypoints = np.concatenate(parts)
+        waypoints.setflags(write=False)
+        self.path_cache[key] = waypoints
+        if len(self.path_cache) > PATH_CACHE_SIZE: self.path_cache.popitem(last=False)
+        return waypoints
+
+    def route_from_point(self, k, dest):
+        # From road point k: along its edge to the nearer end, then on to dest
+        e = int(self.point_edge[k])
+        start, end = self.poly_start[e], self.poly_start[e + 1]
+        u, v = self.edge_uv[e].tolist()
+        if k - start < end - k: lead, via = self.poly[start:k][::-1], u
+        else: lead, via = self.poly[k + 1:end], v
+        return np.concatenate([lead, self.route(via, dest)])
+
+    def random_destination(self, node, rng):
+        # Any other node on the same network
+        group = self.members[self.component[node]]
+        pick = int(group[rng.integers(len(group) - 1)])
+        return int(group[-1]) if pick == node else pick
+
+    def nearest_point(self, x, y):
+        return int(np.argmin(np.hypot(self.poly[:, 0] - x, self.poly[:, 1] - y)))
+
+    def mask(self, shape):
+        # Grid cells holding a road point or junction, e.g. as flow field targets
+        grid = np.zeros(shape, dtype=bool)
+        for pts in (self.poly, self.nodes):
+            grid[pts[:, 1].astype(np.intp), pts[:, 0].astype(np.intp)] = True
+        return grid
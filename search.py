@@ -0,0 +1,201 @@
+from bisect import bisect_left, insort
+from heapq import merge
+
+import numpy as np
+
+PAGE_SIZE = 8           # Results per page in the sidebar
+RANK_LIMIT = 4096       # Larger roles are streamed unsorted
+GRAMS = (1, 2, 3)       # Substring postings hold every n-gram of these lengths
+OVERLAY_LIMIT = 0.1     # Rebuild once this share of agents was re-indexed since the last build
+
+def words(text):
+    # Every word after the first; the first is covered by the whole-name prefix
+    return [w for w in text.replace(" ", "_").split("_")[1:] if w]
+
+def gram_codes(text, n=3):
+    # One int64 per distinct n-gram: n 21-bit code points. Code points are
+    # never 0, so grams of different lengths never share a code.
+    cp = [ord(c) for c in text]
+    codes = set()
+    for k in range(len(cp) - n + 1):
+        code = 0
+        for c in cp[k:k + n]: code = (code << 21) | c
+        codes.add(code)
+    return codes
+
+def rank_keys(ids, lens):
+    # Sorts like (name length, id), the order substring hits are shown in
+    return (lens[ids].astype(np.int64) << 32) | ids
+
+def build_postings(names, lens):
+    # Every (n-gram, id) pair of every name, sorted by n-gram then name
+    # length then id, in a few array passes rather than millions of set
+    # insertions
+    cp = np.frombuffer("\0".join(names).encode("utf-32-le"), np.uint32).astype(np.int64)
+    owner = np.repeat(np.arange(len(names), dtype=np.int32), lens + 1)[:len(cp)]
+    codes, owners = [], []
+    for n in GRAMS:
+        code, inside = np.zeros(len(cp) - n + 1, np.int64), np.ones(len(cp) - n + 1, bool)
+        for k in range(n):
+            part = cp[k:len(cp) - n + 1 + k]
+            code = (code << 21) | part
+            inside &= part != 0    # No gram spans two names
+        codes.append(code[inside])
+        owners.append(owner[:len(code)][inside])
+    codes, owner = np.concatenate(codes), np.concatenate(owners)
+    order = np.lexsort((owner, lens[owner], codes))
+    codes, owner = codes[order], owner[order]
+    fresh = np.ones(len(codes), bool)
+    fresh[1:] = (codes[1:] != codes[:-1]) | (owner[1:] != owner[:-1])
+    codes, owner = codes[fresh], owner[fresh]
+    keys, starts = np.unique(codes, return_index=True)
+    return keys, np.append(starts, len(codes)), owner
+
+# --- AGENT SEARCH INDEX ---
+# Case-insensitive search over username and role. Matches come out ranked
+# in tiers:
+#   1. username starts with the query (exact match first, then alphabetical)
+#   2. a later word of the username starts with it ("mil" -> Chief_Miller)
+#   3. the query appears anywhere in the username (via n-gram postings)
+#   4. the role contains it
+# Prefix tiers bisect sorted (term, id) lists. Trigram postings are built as
+# N-gram postings (1 to 3 characters) are built as sorted arrays in one
+# pass, each ordered by name length then id, so a short query streams its
+# hits straight off one posting and a longer one intersects its trigrams.
+# Agents renamed or added afterwards go into a small set overlay until the
+# next rebuild. Postings only propose candidates; each is checked against
+# its current name, so stale entries never show up. Tiers are produced lazily and the ranked list is cached
+# per query string, so a keystroke only does the work for the pages shown,
+# and redraws and paging cost nothing until the query or the index changes.
+class SearchIndex:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.docs = {}        # id -> (username lower, role lower)
+        self.names = []       # Sorted (username lower, id)
+        self.words = []       # Sorted (later word, id)
+        self.roles = {}       # role lower -> set of ids
+        self.keys = np.empty(0, np.int64)    # N-gram codes with postings
+        self.starts = np.zeros(1, np.intp)   # keys[k]'s ids are ids[starts[k]:starts[k + 1]]
+        self.ids = np.empty(0, np.int32)
+        self.lens = np.empty(0, np.int32)    # Name lengths at build time, for ordering substring hits
+        self.overlay = {}     # n-gram code -> ids indexed since the build
+        self.touched = 0
+        self.invalidate()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def invalidate(self):
+        self.query = None
+        self.ranked = []
+        self.pending = None   # Generator for the rest of the ranked list
+
+    def build(self, usernames, roles):
+        # Bulk load of agents 0..n-1; much faster than set() per agent
+        self.clear()
+        names = [n.lower() for n in usernames]
+        for i, (name, role) in enumerate(zip(names, roles)):
+            role = role.lower()
+            self.docs[i] = (name, role)
+            self.roles.setdefault(role, set()).add(i)
+        self.names = sorted(zip(names, range(len(names))))
+        self.words = sorted((w, i) for i, name in enumerate(names) for w in words(name))
+        self.lens = np.fromiter(map(len, names), np.int32, len(names))
+        self.keys, self.starts, self.ids = build_postings(names, self.lens)
+
+    def rebuild(self):
+        top = max(self.docs, default=-1) + 1
+        docs = [self.docs.get(i, ("", "")) for i in range(top)]
+        self.build([d[0] for d in docs], [d[1] for d in docs])
+        for i in range(top):
+            if docs[i] == ("", "") and i in self.docs: self.remove(i)
+
+    def set(self, i, username, role):
+        # Adds agent i, or re-indexes it after a rename
+        name, role = username.lower(), role.lower()
+        if self.docs.get(i) == (name, role): return
+        self.remove(i)
+        self.invalidate()
+        self.docs[i] = (name, role)
+        insort(self.names, (name, i))
+        for w in words(name): insort(self.words, (w, i))
+        for n in GRAMS:
+            for g in gram_codes(name, n): self.overlay.setdefault(g, set()).add(i)
+        self.roles.setdefault(role, set()).add(i)
+        self.touched += 1
+        if self.touched > OVERLAY_LIMIT * max(len(self.docs), 1000): self.rebuild()
+
+    def remove(self, i):
+        # The agent's n-gram postings are left to be filtered out at query time
+        if i not in self.docs: return
+        name, role = self.docs.pop(i)
+        del self.names[bisect_left(self.names, (name, i))]
+        for w in words(name): del self.words[bisect_left(self.words, (w, i))]
+        self.roles[role].discard(i)
+        self.invalidate()
+
+    def page(self, query, n=0, size=PAGE_SIZE):
+        # (ids on page n, whether a later page exists)
+        q = query.lower()
+        if q != self.query:
+            self.invalidate()
+            self.query = q
+            self.pending = self.rank(q) if q else iter(())
+        want = (n + 1) * size + 1
+        while len(self.ranked) < want:
+            i = next(self.pending, None)
+            if i is None: break
+            self.ranked.append(i)
+        return self.ranked[n * size:(n + 1) * size], len(self.ranked) > (n + 1) * size
+
+    @staticmethod
+    def prefixed(pairs, q):
+        k = bisect_left(pairs, (q,))
+        while k < len(pairs) and pairs[k][0].startswith(q):
+            yield pairs[k][1]
+            k += 1
+
+    def rank(self, q):
+        seen = set()
+        for tier in (self.prefixed(self.names, q), self.prefixed(self.words, q), self.substring(q), self.by_role(q)):
+            for i in tier:
+                if i not in seen:
+                    seen.add(i)
+                    yield i
+
+    def posting(self, code):
+        k = np.searchsorted(self.keys, code)
+        if k == len(self.keys) or self.keys[k] != code: return self.ids[:0]
+        return self.ids[self.starts[k]:self.starts[k + 1]]
+
+    def candidates(self, codes):
+        # Ids holding every gram, in posting order: the shortest base posting
+        # checked against the others by binary search, plus the overlay's
+        # intersection
+        postings = sorted((self.posting(c) for c in codes), key=len)
+        found = postings[0]
+        if len(postings) > 1: want = rank_keys(found, self.lens)
+        for p in postings[1:]:
+            if not len(found): break
+            keys = rank_keys(p, self.lens)
+            at = np.minimum(np.searchsorted(keys, want), len(p) - 1)
+            hit = keys[at] == want
+            found, want = found[hit], want[hit]
+        extra = set.intersection(*(self.overlay.get(c, set()) for c in codes)) if self.overlay else set()
+        return found, extra
+
+    def substring(self, q):
+        docs = self.docs
+        found, extra = self.candidates(gram_codes(q, min(len(q), GRAMS[-1])))
+        # Shortest names first; candidates are only checked as pages are filled
+        base = (i for k in range(0, len(found), PAGE_SIZE * 16) for i in found[k:k + PAGE_SIZE * 16].tolist())
+        key = lambda i: (len(docs[i][0]) if i in docs else 0, i)
+        for i in merge(base, sorted(extra, key=key), key=key):
+            if i in docs and q in docs[i][0]: yield i
+
+    def by_role(self, q):
+        for role in sorted(r for r in self.roles if q in r):
+            ids = self.roles[role]
+            yield from sorted(ids) if len(ids) <= RANK_LIMIT else ids
@@ -0,0 +1,62 @@
+import json
+import zlib
+import struct
+
+import numpy as np
+
+from cache import atomic_write
+from stream import AGENT_DTYPE, quantize
+from journal import write_json
+
+SNAPSHOT_VERSION = 1
+MAGIC = b"AEGS"
+COMPRESSED = 1
+# magic, version, flags, world w, world h, agent count, metadata bytes
+HEADER = struct.Struct("<4sBBHHII")
+ZLIB_LEVEL = 1   # Positions barely compress past level 1; speed matters more
+
+# --- STATE SNAPSHOTS ---
+# The periodic state file, in one of two encodings picked by extension:
+#   .json  the original readable format, kept for debugging
+#   other  a header, a small JSON block (run, seq, recent events), then one
+#          packed record per agent: uint16 x, uint16 y, uint8 hostility,
+#          optionally zlib-compressed (positions gain ~15% for ~15x the time)
+# Both load into the same dict, with agents as an AGENT_DTYPE array.
+def is_json(path):
+    return path.lower().endswith(".json")
+
+def save_state(path, meta, xs, ys, hostility, world, compress=False):
+    # Renamed into place either way, so a reader never sees half a file
+    if is_json(path):
+        heat = [[x, y, round(h, 2)] for x, y, h in zip(np.asarray(xs).astype(int).tolist(), np.asarray(ys).astype(int).tolist(), np.asarray(hostility).tolist())]
+        write_json(path, dict(meta, heat_map=heat, world_dim=list(world)))
+        return
+    body = quantize(xs, ys, hostility).tobytes()
+    if compress: body = zlib.compress(body, ZLIB_LEVEL)
+    extra = json.dumps(meta).encode()
+    head = HEADER.pack(MAGIC, SNAPSHOT_VERSION, COMPRESSED if compress else 0, world[0], world[1], len(xs), len(extra))
+    atomic_write(path, "wb", lambda f: f.writelines((head, extra, body)))
+
+def load_state(path):
+    # Raises OSError or ValueError on a missing or malformed file
+    if is_json(path):
+        with open(path, "r") as f: data = json.load(f)
+        heat = np.asarray(data.pop("heat_map", []), dtype=float).reshape(-1, 3)
+        data["agents"] = quantize(heat[:, 0], heat[:, 1], heat[:, 2])
+        data["world"] = tuple(data.pop("world_dim", (0, 0)))
+        return data
+    with open(path, "rb") as f: raw = f.read()
+    if len(raw) < HEADER.size: raise ValueError("truncated snapshot header")
+    magic, version, flags, w, h, count, extra = HEADER.unpack_from(raw)
+    if magic != MAGIC: raise ValueError("not an Aegis snapshot")
+    if version != SNAPSHOT_VERSION: raise ValueError(f"unsupported snapshot version {version}")
+    start = HEADER.size + extra
+    data = json.loads(raw[HEADER.size:start])
+    body = raw[start:]
+    if flags & COMPRESSED:
+        try: body = zlib.decompress(body)
+        except zlib.error as e: raise ValueError(f"corrupt snapshot body: {e}")
+    if len(body) != count * AGENT_DTYPE.itemsize: raise ValueError("snapshot body size mismatch")
+    data["agents"] = np.frombuffer(body, AGENT_DTYPE, count)
+    data["world"] = (w, h)
+    return data
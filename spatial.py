@@ -0,0 +1,97 @@
+import numpy as np
+
+# Cell offsets that visit every neighbouring cell pair exactly once
+HALF_NEIGHBOURS = ((0, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+# --- UNIFORM SPATIAL HASH ---
+# Counting-sort bucket grid over parallel x/y arrays. Contact checks only look
+# at the 3x3 block of cells around each agent instead of the whole population.
+class SpatialGrid:
+    def __init__(self, cell_size, width, height):
+        self.cell_size = cell_size
+        self.cols = int(width // cell_size) + 1
+        self.rows = int(height // cell_size) + 1
+        self.rebuild(np.empty(0), np.empty(0))
+
+    def rebuild(self, xs, ys):
+        self.xs, self.ys = xs, ys
+        self.cx = np.clip((xs // self.cell_size).astype(np.intp), 0, self.cols - 1)
+        self.cy = np.clip((ys // self.cell_size).astype(np.intp), 0, self.rows - 1)
+        keys = self.cy * self.cols + self.cx
+        self.order = np.argsort(keys, kind="stable")
+        self.counts = np.bincount(keys, minlength=self.cols * self.rows)
+        self.starts = np.cumsum(self.counts) - self.counts
+
+    def _gather(self, src, cells):
+        # Expands every (src[k], cells[k]) into one row per member of that cell
+        c = self.counts[cells]
+        base = np.repeat(self.starts[cells] - (np.cumsum(c) - c), c)
+        return np.repeat(src, c), self.order[base + np.arange(int(c.sum()))]
+
+    def pairs(self, max_dist):
+        # Returns (i, j, dist) for every unordered pair closer than max_dist
+        idx = np.arange(len(self.xs))
+        found_i, found_j = [], []
+        for dx, dy in HALF_NEIGHBOURS:
+            nx, ny = self.cx + dx, self.cy + dy
+            ok = (nx >= 0) & (nx < self.cols) & (ny < self.rows)
+            i, j = self._gather(idx[ok], ny[ok] * self.cols + nx[ok])
+            if dx == 0 and dy == 0:
+                keep = i < j
+                i, j = i[keep], j[keep]
+            found_i.append(i); found_j.append(j)
+        i, j = np.concatenate(found_i), np.concatenate(found_j)
+        dist = np.hypot(self.xs[i] - self.xs[j], self.ys[i] - self.ys[j])
+        close = dist < max_dist
+        return i[close], j[close], dist[close]
+
+    def query_rect(self, x0, y0, x1, y1):
+        # Indices inside [x0, x1) x [y0, y1), in index order. Only the cell
+        # rows the rect spans are read, so a zoomed view touches few cells.
+        cs = self.cell_size
+        c0, c1 = max(0, int(x0 // cs)), min(self.cols - 1, int(x1 // cs))
+        r0, r1 = max(0, int(y0 // cs)), min(self.rows - 1, int(y1 // cs))
+        if c0 > c1 or r0 > r1: return np.empty(0, dtype=np.intp)
+        rows = []
+        for gy in range(r0, r1 + 1):
+            start = self.starts[gy * self.cols + c0]
+            end = self.starts[gy * self.cols + c1] + self.counts[gy * self.cols + c1]
+            rows.append(self.order[start:end])
+        found = np.concatenate(rows)
+        xs, ys = self.xs[found], self.ys[found]
+        return np.sort(found[(xs >= x0) & (xs < x1) & (ys >= y0) & (ys < y1)])
+
+    def query_radius(self, x, y, radius):
+        # Indices within radius of (x, y), nearest first
+        cs = self.cell_size
+        x0, x1 = max(0, int((x - radius) // cs)), min(self.cols - 1, int((x + radius) // cs))
+        y0, y1 = max(0, int((y - radius) // cs)), min(self.rows - 1, int((y + radius) // cs))
+        if x0 > x1 or y0 > y1: return np.empty(0, dtype=np.intp)
+        rows = []
+        for gy in range(y0, y1 + 1):
+            start = self.starts[gy * self.cols + x0]
+            end = self.starts[gy * self.cols + x1] + self.counts[gy * self.cols + x1]
+            rows.append(self.order[start:end])
+        found = np.concatenate(rows)
+        dist = np.hypot(self.xs[found] - x, self.ys[found] - y)
+        near = dist < radius
+        return found[near][np.argsort(dist[near], kind="stable")]
+
+    def query_radii(self, xs, ys, radii):
+        # (k, i, dist) for every agent i within radii[k] of (xs[k], ys[k]):
+        # the cells around all the centres are expanded in one gather, so a
+        # batch of queries costs one pass instead of one scan each
+        xs, ys = np.asarray(xs, float), np.asarray(ys, float)
+        radii = np.broadcast_to(np.asarray(radii, float), xs.shape)
+        if not len(xs): return np.empty(0, np.intp), np.empty(0, np.intp), np.empty(0)
+        cs = self.cell_size
+        span = np.arange(-int(radii.max() // cs) - 1, int(radii.max() // cs) + 2)
+        ox, oy = (a.ravel() for a in np.meshgrid(span, span))
+        nx = (xs // cs).astype(np.intp)[:, None] + ox
+        ny = (ys // cs).astype(np.intp)[:, None] + oy
+        ok = (nx >= 0) & (nx < self.cols) & (ny >= 0) & (ny < self.rows)
+        src = np.broadcast_to(np.arange(len(xs))[:, None], nx.shape)[ok]
+        k, i = self._gather(src, (ny * self.cols + nx)[ok])
+        dist = np.hypot(self.xs[i] - xs[k], self.ys[i] - ys[k])
+        near = dist < radii[k]
+        return k[near], i[near], dist[near]
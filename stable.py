@@ -2,6 +2,12 @@ import pygame
 import random
 import math
 import os
+import numpy as np
+from walkability import WalkGrid, load_map_asset
+from roads import RoadGraph
+from fields import MapFields
+from render import WorldRenderer
+from text import render_text
 
 # --- SETTINGS ---
 WIDTH, HEIGHT = 1100, 700
@@ -9,6 +15,7 @@ UI_WIDTH = 300
 MAP_AREA = WIDTH - UI_WIDTH
 FPS = 60
 AGENT_COUNT = 45
+COMMUTER_SHARE = 0.7  # Agents that travel between road destinations
 
 # Surveillance Aesthetic Colors
 COLOR_BG = (5, 10, 15)
@@ -20,13 +27,19 @@ COLOR_GRID = (15, 25, 35)
 class MapHandler:
     def __init__(self):
         self.surface = None
-        self.mask = None
+        self.walk = None
+        self.source = None
         self.load_map()
+        self.roads = RoadGraph.load_or_build(self.walk, self.source, (MAP_AREA, HEIGHT))
+        self.fields = MapFields.load_or_build(self.walk, self.source, (MAP_AREA, HEIGHT))
+        # Route picks share the agents' random stream so seeded runs repeat
+        self.rng = np.random.default_rng(random.getrandbits(32))
 
     def load_map(self):
         if os.path.exists("map.png"):
-            self.surface = pygame.image.load("map.png").convert()
-            self.surface = pygame.transform.scale(self.surface, (MAP_AREA, HEIGHT))
+            self.source = "map.png"
+            surface, self.walk = load_map_asset(self.source, (MAP_AREA, HEIGHT))
+            self.surface = surface.convert()
         else:
             # Generate fallback: Dark city with white boulevards
             self.surface = pygame.Surface((MAP_AREA, HEIGHT))
@@ -35,13 +48,10 @@ class MapHandler:
                 pygame.draw.rect(self.surface, COLOR_WHITE, (i, 0, 50, HEIGHT))
             for i in range(0, HEIGHT, 180):
                 pygame.draw.rect(self.surface, COLOR_WHITE, (0, i, MAP_AREA, 50))
-
-        self.mask = pygame.mask.from_threshold(self.surface, COLOR_WHITE, (10, 10, 10))
+            self.walk = WalkGrid.from_surface(self.surface)
 
     def is_walkable(self, x, y):
-        if 0 <= x < MAP_AREA and 0 <= y < HEIGHT:
-            return self.mask.get_at((int(x), int(y)))
-        return False
+        return self.walk.is_walkable(x, y)
 
 class Agent:
     def __init__(self, id, map_handler):
@@ -65,6 +75,9 @@ class Agent:
             "Eating a Big Number 5", "Ignoring Roman's Call", 
             "Buying Sprunk", "Heading to Malibu Club"
         ])
+        self.route, self.route_pos, self.dest = None, 0, -1
+        if len(self.mh.roads.poly) and random.random() < COMMUTER_SHARE:
+            self.start_commute()
 
     def spawn(self):
         for _ in range(500):
@@ -73,18 +86,33 @@ class Agent:
                 self.x, self.y = rx, ry
                 return
 
+    def start_commute(self):
+        # Start on a random road point, heading for a random destination
+        roads = self.mh.roads
+        k = random.randrange(len(roads.poly))
+        self.x, self.y = roads.poly[k].tolist()
+        self.dest = roads.random_destination(int(roads.edge_uv[roads.point_edge[k], 0]), self.mh.rng)
+        self.route, self.route_pos = roads.route_from_point(k, self.dest), 0
+
+    def next_leg(self):
+        roads = self.mh.roads
+        self.route_pos += 1
+        if self.route_pos >= len(self.route):
+            here, self.dest = self.dest, roads.random_destination(self.dest, self.mh.rng)
+            self.route, self.route_pos = roads.route(here, self.dest), 0
+
     def update(self, is_controlled):
         if is_controlled:
+            self.route = None  # Taken off its commute; wanders once released
             keys = pygame.key.get_pressed()
             dx, dy = 0, 0
             if keys[pygame.K_LEFT]: dx = -self.speed * 1.5
             if keys[pygame.K_RIGHT]: dx = self.speed * 1.5
             if keys[pygame.K_UP]: dy = -self.speed * 1.5
             if keys[pygame.K_DOWN]: dy = self.speed * 1.5
-            
-            if self.mh.is_walkable(self.x + dx*3, self.y + dy*3):
-                self.x += dx
-                self.y += dy
+            dx, dy = self.mh.fields.deflect(self.x, self.y, dx, dy)
+            self.x += dx
+            self.y += dy
             return
 
         if self.state == "IDLE":
@@ -98,16 +126,33 @@ class Agent:
                 self.timer = random.randint(40, 120)
                 return
 
+            if self.route is not None:
+                self.commute()
+                return
+
+            # Walls turn the agent along them instead of flipping its heading
             rad = math.radians(self.angle)
-            nx, ny = self.x + math.cos(rad)*self.speed, self.y + math.sin(rad)*self.speed
-            
-            if self.mh.is_walkable(nx + math.cos(rad)*12, ny + math.sin(rad)*12):
-                self.x, self.y = nx, ny
-            else:
-                self.angle = random.choice([0, 90, 180, 270])
+            vx, vy = math.cos(rad)*self.speed, math.sin(rad)*self.speed
+            dx, dy = self.mh.fields.deflect(self.x, self.y, vx, vy)
+            if (dx, dy) != (vx, vy): self.angle = math.degrees(math.atan2(dy, dx))
+            self.x += dx
+            self.y += dy
+
+    def commute(self):
+        # Waypoints trace the road centre line, so commuters skip the wall probe
+        # (map.png roads are about a pixel wide and it would snag every corner)
+        gx, gy = self.route[self.route_pos]
+        dist = math.hypot(gx - self.x, gy - self.y)
+        if dist <= self.speed:
+            self.x, self.y = gx, gy
+            self.next_leg()
+            return
+        self.angle = math.degrees(math.atan2(gy - self.y, gx - self.x))
+        self.x += (gx - self.x) / dist * self.speed
+        self.y += (gy - self.y) / dist * self.speed
 
 class Camera:
-    def _init_(self):
+    def __init__(self):
         self.target_zoom = 1.0
         self.current_zoom = 1.0
         self.offset_x = 0
@@ -129,47 +174,47 @@ class Camera:
         self.current_zoom += (self.target_zoom - self.current_zoom) * 0.08
 
 class Simulation:
-    def _init_(self):
+    def __init__(self):
         pygame.init()
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         self.mh = MapHandler()
         self.camera = Camera()
+        # Background grid is baked into the static layer once
+        static = self.mh.surface.copy()
+        for x in range(0, MAP_AREA, 40):
+            pygame.draw.line(static, COLOR_GRID, (x, 0), (x, HEIGHT))
+        for y in range(0, HEIGHT, 40):
+            pygame.draw.line(static, COLOR_GRID, (0, y), (MAP_AREA, y))
+        self.layers = WorldRenderer(static, (MAP_AREA, HEIGHT))
         self.agents = [Agent(i, self.mh) for i in range(AGENT_COUNT)]
         self.selected = None
         self.ui_scale = 0.0 
         self.clock = pygame.time.Clock()
 
     def draw_world(self):
-        # Create world surface
-        world_surf = pygame.Surface((MAP_AREA, HEIGHT))
-        world_surf.blit(self.mh.surface, (0,0))
-        
-        # Draw Background Grid for style
-        for x in range(0, MAP_AREA, 40):
-            pygame.draw.line(world_surf, COLOR_GRID, (x, 0), (x, HEIGHT))
-        for y in range(0, HEIGHT, 40):
-            pygame.draw.line(world_surf, COLOR_GRID, (0, y), (MAP_AREA, y))
+        # Cached, pre-zoomed map layer; agents drawn straight in screen space
+        zoom = self.camera.current_zoom
+        view = self.layers
+        view.invalidate()  # run() clears the whole screen every frame
+        view.begin(self.screen, pygame.Rect(self.camera.offset_x, self.camera.offset_y, int(MAP_AREA / zoom), int(HEIGHT / zoom)))
+        scale = view.scale[0]
+        cull = view.visible(10)  # Agent radius plus the app ring
 
         for a in self.agents:
+            if not cull.collidepoint(a.x, a.y): continue
             # FIXED GRADIENT: Hostility 1.0 = Red, 0.0 = Green
             r = int(255 * a.hostility)
             g = int(255 * (1 - a.hostility))
             b = 50
             
-            pygame.draw.circle(world_surf, (r, g, b), (int(a.x), int(a.y)), a.radius)
+            x, y = view.to_screen(a.x, a.y)
+            pos = (int(x), int(y))
+            pygame.draw.circle(self.screen, (r, g, b), pos, max(int(a.radius * scale), 1))
             if a.has_app:
-                pygame.draw.circle(world_surf, COLOR_WHITE, (int(a.x), int(a.y)), a.radius+3, 1)
+                pygame.draw.circle(self.screen, COLOR_WHITE, pos, int((a.radius+3) * scale), max(int(scale), 1))
 
-        # Apply Camera Zoom/Offset
-        zoom = self.camera.current_zoom
-        view_w, view_h = int(MAP_AREA / zoom), int(HEIGHT / zoom)
-        
-        sub_rect = pygame.Rect(self.camera.offset_x, self.camera.offset_y, view_w, view_h)
-        sub_rect = sub_rect.clamp(pygame.Rect(0, 0, MAP_AREA, HEIGHT))
-        
-        view_surf = world_surf.subsurface(sub_rect)
-        scaled_view = pygame.transform.scale(view_surf, (MAP_AREA, HEIGHT))
-        self.screen.blit(scaled_view, (0, 0))
+        self.screen.set_clip(None)
+        view.end()
 
     def draw_ui(self):
         target_s = 1.0 if self.selected else 0.0
@@ -181,17 +226,14 @@ class Simulation:
             pygame.draw.line(self.screen, COLOR_ACCENT, (ui_x, 0), (ui_x, HEIGHT), 3)
             
             if self.selected:
-                f_hdr = pygame.font.SysFont("Courier", 22, bold=True)
-                f_std = pygame.font.SysFont("Courier", 16)
-                
-                self.screen.blit(f_hdr.render("TARGET DATA", True, COLOR_ACCENT), (ui_x + 25, 40))
-                self.screen.blit(f_std.render(f"ID: AEGIS_{self.selected.id:03d}", True, COLOR_WHITE), (ui_x + 25, 80))
-                self.screen.blit(f_std.render(f"HOSTILITY: {int(self.selected.hostility*100)}%", True, COLOR_WHITE), (ui_x + 25, 110))
-                self.screen.blit(f_std.render(f"ACTIVITY: ", True, COLOR_ACCENT), (ui_x + 25, 150))
-                self.screen.blit(f_std.render(self.selected.activity, True, COLOR_WHITE), (ui_x + 25, 175))
+                self.screen.blit(render_text("TARGET DATA", COLOR_ACCENT, 22, bold=True), (ui_x + 25, 40))
+                self.screen.blit(render_text(f"ID: AEGIS_{self.selected.id:03d}", COLOR_WHITE, 16), (ui_x + 25, 80))
+                self.screen.blit(render_text(f"HOSTILITY: {int(self.selected.hostility*100)}%", COLOR_WHITE, 16), (ui_x + 25, 110))
+                self.screen.blit(render_text(f"ACTIVITY: ", COLOR_ACCENT, 16), (ui_x + 25, 150))
+                self.screen.blit(render_text(self.selected.activity, COLOR_WHITE, 16), (ui_x + 25, 175))
                 
                 msg = "OVERRIDE ACTIVE (ARROWS)" if self.selected.has_app else "HACK FAILED: NO APP"
-                self.screen.blit(f_std.render(msg, True, (150, 150, 150)), (ui_x + 25, 250))
+                self.screen.blit(render_text(msg, (150, 150, 150), 16), (ui_x + 25, 250))
 
     def draw_scanlines(self):
         for y in range(0, HEIGHT, 4):
@@ -0,0 +1,477 @@
+import json
+import math
+import time
+import socket
+import struct
+import asyncio
+import threading
+from collections import deque
+
+import numpy as np
+
+from spatial import SpatialGrid
+from personnel import PersonnelDirectory, USERS_FILE
+from population import HISTORY
+
+STREAM_HOST = "127.0.0.1"   # 0.0.0.0 to serve terminals on other machines
+STREAM_PORT = 47800
+KEYFRAME_INTERVAL = 600   # Ticks between unsolicited keyframes (10 s at 60 FPS)
+MAX_BACKLOG = 1 << 20     # Bytes buffered for one terminal before its frames are dropped
+EVENT_BACKLOG = 4 << 20   # Events are only dropped past this
+RECENT_EVENTS = 15        # Replayed to each terminal after it logs in
+RETRY_SECONDS = 2.0       # Terminal reconnect interval
+COARSE_CELL = 40          # World pixels per cell of the aggregate layer
+COARSE_INTERVAL = 15      # Ticks between aggregate layers for subscribed terminals (4 Hz)
+TRACK_RADIUS = 100        # Default radius around a tracked agent
+
+# --- WIRE FORMAT ---
+# Every message is a little-endian uint32 length, then a kind byte.
+# Admin -> terminal messages carry a fixed header and a body: packed agent
+# records for frames, UTF-8 JSON for everything else. A keyframe carries
+# every agent in id order; a delta carries only the agents whose quantized
+# position or hostility changed since the previous tick. Each published
+# tick takes the next sequence number, so a terminal that sees a gap asks
+# for a keyframe instead of drifting.
+# A terminal subscribed to a region gets neither: each tick it gets a region
+# frame (the bounds served, then every agent inside with its id) and every
+# few ticks a coarse frame (cell size, cols, rows, then agent count and mean
+# hostility per cell), so its traffic follows the area it watches.
+# Population stats go to every terminal once per sample as JSON: the
+# current numbers and the newest trend sample. A terminal that logs in gets
+# the whole trend once.
+# Terminal -> admin messages are the kind byte and a JSON body.
+KEYFRAME, DELTA, EVENT, AUTH_OK, AUTH_FAIL, COARSE, REGION, STATS = 1, 2, 3, 4, 5, 6, 7, 8
+AUTH, RESYNC, SUBSCRIBE = 16, 17, 18
+LENGTH = struct.Struct("<I")
+HEADER = struct.Struct("<BIIHHI")  # kind, seq, tick, world w, world h, record count / body bytes
+COARSE_HEADER = struct.Struct("<HHH")  # cell size, cols, rows
+BOUNDS = struct.Struct("<hhhh")        # x0, y0, x1, y1 of the region served
+AGENT_DTYPE = np.dtype([("x", "<u2"), ("y", "<u2"), ("h", "u1")])
+DELTA_DTYPE = np.dtype([("id", "<u4"), ("x", "<u2"), ("y", "<u2"), ("h", "u1")])
+COARSE_DTYPE = np.dtype([("n", "<u2"), ("h", "u1")])
+
+def quantize(xs, ys, hostility):
+    # Whole pixels and hostility in 1/255 steps
+    out = np.empty(len(xs), AGENT_DTYPE)
+    out["x"] = np.clip(xs, 0, 0xFFFF)
+    out["y"] = np.clip(ys, 0, 0xFFFF)
+    out["h"] = np.clip(np.rint(np.asarray(hostility) * 255), 0, 255)
+    return out
+
+def encode(kind, seq, tick, world, records, prefix=b""):
+    body = HEADER.pack(kind, seq & 0xFFFFFFFF, tick & 0xFFFFFFFF, world[0], world[1], len(records)) + prefix + records.tobytes()
+    return LENGTH.pack(len(body)) + body
+
+def with_ids(records, ids):
+    rec = np.empty(len(ids), DELTA_DTYPE)
+    rec["id"] = ids
+    for f in AGENT_DTYPE.names: rec[f] = records[f][ids]
+    return rec
+
+def parse_region(req):
+    # {"rect": [x0, y0, x1, y1]} or {"target": agent id, "radius": r};
+    # anything else means the full feed
+    if "rect" in req:
+        x0, y0, x1, y1 = (int(v) for v in req["rect"])
+        if x1 > x0 and y1 > y0: return {"rect": (x0, y0, x1, y1)}
+    elif "target" in req:
+        return {"target": int(req["target"]), "radius": max(1, int(req.get("radius", TRACK_RADIUS)))}
+    return None
+
+def bin_agents(records, world):
+    # Shared by every subscribed terminal for one tick
+    grid = SpatialGrid(COARSE_CELL, world[0], world[1])
+    grid.rebuild(records["x"].astype(np.int32), records["y"].astype(np.int32))
+    return grid
+
+def encode_coarse(seq, tick, world, grid, records):
+    keys = grid.cy * grid.cols + grid.cx
+    total = np.bincount(keys, weights=records["h"], minlength=len(grid.counts))
+    cells = np.empty(len(grid.counts), COARSE_DTYPE)
+    cells["n"] = np.minimum(grid.counts, 0xFFFF)
+    cells["h"] = np.rint(total / np.maximum(grid.counts, 1))
+    return encode(COARSE, seq, tick, world, cells, COARSE_HEADER.pack(grid.cell_size, grid.cols, grid.rows))
+
+def encode_json(kind, data, seq=0, tick=0):
+    payload = json.dumps(data).encode()
+    body = HEADER.pack(kind, seq & 0xFFFFFFFF, tick & 0xFFFFFFFF, 0, 0, len(payload)) + payload
+    return LENGTH.pack(len(body)) + body
+
+def encode_request(kind, data=None):
+    body = bytes([kind]) + json.dumps(data or {}).encode()
+    return LENGTH.pack(len(body)) + body
+
+class _Terminal:
+    def __init__(self, writer, person):
+        self.writer = writer
+        self.name = person["username"]
+        self.role = person.get("role", "")
+        self.needs_key = True
+        self.dropped = 0    # Frames skipped because the terminal fell behind
+        self.sent = 0       # Bytes queued for this terminal
+        self.region = None  # parse_region() result; None for the full feed
+        self.bounds = None  # Rect last served for the region
+        self.center = None  # Tracked agent's last position
+        self.coarse_tick = 0
+
+    def subscribe(self, req):
+        self.region = parse_region(req)
+        self.bounds = self.center = None
+        self.needs_key = True   # Coarse layer now, or a keyframe back on the full feed
+
+    def covers(self, pos):
+        if self.region is None or pos is None: return True
+        if self.center is not None:
+            return math.hypot(pos[0] - self.center[0], pos[1] - self.center[1]) < self.region["radius"]
+        x0, y0, x1, y1 = self.bounds or self.region.get("rect", (0, 0, 0, 0))
+        return x0 <= pos[0] < x1 and y0 <= pos[1] < y1
+
+    def backlog(self):
+        return self.writer.transport.get_write_buffer_size()
+
+    def send(self, msg, limit=MAX_BACKLOG):
+        # Whole messages only, so a skipped frame never tears the stream
+        if self.writer.is_closing(): return False
+        if self.backlog() > limit: return False
+        self.writer.write(msg)
+        self.sent += len(msg)
+        return True
+
+# --- ADMIN SIDE ---
+# An asyncio server on its own thread accepts terminals, checks their login
+# against users.json and fans frames and events out to them. The simulation
+# thread only quantizes the population and encodes one delta per tick, then
+# hands the latest tick over; it never waits on a socket. If the network
+# thread misses ticks it sends keyframes instead of the deltas it missed.
+# A terminal whose send buffer is over MAX_BACKLOG skips frames until it
+# drains, then gets a keyframe, so one slow laptop never holds up the rest.
+# Region subscribers are served from one spatial binning per tick, so each
+# costs about what its region holds rather than the whole population.
+class StateStreamServer:
+    def __init__(self, port=STREAM_PORT, host=STREAM_HOST, keyframe_every=KEYFRAME_INTERVAL, users_path=USERS_FILE, personnel=None):
+        # personnel: a directory the caller already loaded, shared rather than read again
+        self.keyframe_every = keyframe_every
+        self.personnel = personnel if personnel is not None else PersonnelDirectory(users_path)
+        self.terminals = []
+        self.recent = deque(maxlen=RECENT_EVENTS)
+        self.stats = None    # Latest population stats with the full trend, for new logins
+        self.seq = 0
+        self.last = None
+        self.last_key = 0
+        self.sent_seq = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        self.latest = None      # (seq, tick, world, records, delta) waiting for the network thread
+        self.scheduled = False
+        self.error = None
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self.serve, args=(host, port, ready), name="state-stream", daemon=True)
+        self.thread.start()
+        ready.wait()
+        if self.error: raise self.error
+
+    # Network thread
+    def serve(self, host, port, ready):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(asyncio.start_server(self.handle, host, port))
+        except OSError as e:
+            self.error = e
+            ready.set()
+            self.loop.close()
+            return
+        self.port = self.server.sockets[0].getsockname()[1]
+        ready.set()
+        self.loop.run_forever()
+        # Hang up on every terminal and let their handlers unwind
+        self.server.close()
+        for t in self.terminals: t.writer.close()
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks: task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.close()
+
+    async def read_request(self, reader):
+        (n,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+        body = await reader.readexactly(n)
+        return body[0], json.loads(body[1:] or b"{}")
+
+    def login(self, creds):
+        # On an executor thread: it may re-read users.json, and hashing is slow
+        # on purpose, so it stays off the loop that feeds everyone else
+        self.personnel.refresh()
+        return self.personnel.verify(str(creds.get("username")), str(creds.get("password", "")))
+
+    async def handle(self, reader, writer):
+        sock = writer.get_extra_info("socket")
+        if sock is not None: sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        term = None
+        try:
+            kind, creds = await asyncio.wait_for(self.read_request(reader), 10)
+            person = await self.loop.run_in_executor(None, self.login, creds) if kind == AUTH else None
+            if person is None:
+                writer.write(encode_json(AUTH_FAIL, {"reason": "ACCESS DENIED"}))
+                await writer.drain()
+                return
+            term = _Terminal(writer, person)
+            writer.write(encode_json(AUTH_OK, person))
+            for ev in self.recent: writer.write(encode_json(EVENT, ev))
+            if self.stats: writer.write(encode_json(STATS, self.stats))
+            self.terminals.append(term)
+            while True:
+                kind, req = await self.read_request(reader)
+                if kind == RESYNC: term.needs_key = True
+                elif kind == SUBSCRIBE: term.subscribe(req)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, asyncio.CancelledError, ConnectionError, ValueError, TypeError, IndexError):
+            pass
+        finally:
+            if term in self.terminals: self.terminals.remove(term)
+            writer.close()
+
+    def fanout(self):
+        with self.lock:
+            seq, tick, world, records, delta = self.latest
+            self.latest, self.scheduled = None, False
+        missed = seq != self.sent_seq + 1
+        self.sent_seq = seq
+        key = grid = coarse = None
+        for t in self.terminals:
+            if t.region is not None:
+                if grid is None: grid = bin_agents(records, world)
+                if t.needs_key or tick - t.coarse_tick >= COARSE_INTERVAL:
+                    if coarse is None: coarse = encode_coarse(seq, tick, world, grid, records)
+                    if self.deliver(t, coarse): t.coarse_tick = tick
+                self.deliver(t, self.region_frame(t, seq, tick, world, grid, records))
+                continue
+            if t.needs_key or missed or delta is None:
+                if key is None: key = encode(KEYFRAME, seq, tick, world, records)
+                msg = key
+            else:
+                msg = delta
+            self.deliver(t, msg)
+
+    def deliver(self, t, msg):
+        if t.send(msg):
+            t.needs_key = False
+            self.bytes_sent += len(msg)
+            return True
+        t.dropped += 1
+        t.needs_key = True
+        return False
+
+    def region_frame(self, t, seq, tick, world, grid, records):
+        r = t.region
+        if "rect" in r:
+            x0, y0, x1, y1 = r["rect"]
+            ids = grid.query_rect(x0, y0, x1, y1)
+        elif 0 <= r["target"] < len(records):
+            cx, cy, rad = int(records["x"][r["target"]]), int(records["y"][r["target"]]), r["radius"]
+            x0, y0, x1, y1 = cx - rad, cy - rad, cx + rad, cy + rad
+            ids = np.sort(grid.query_radius(cx, cy, rad))
+            t.center = (cx, cy)
+        else:
+            x0 = y0 = x1 = y1 = 0
+            ids = np.empty(0, np.intp)
+        t.bounds = (x0, y0, x1, y1)
+        clamp = lambda v: max(-0x8000, min(0x7FFF, v))
+        return encode(REGION, seq, tick, world, with_ids(records, ids), BOUNDS.pack(*map(clamp, t.bounds)))
+
+    def broadcast_event(self, event):
+        self.recent.append(event)
+        msg = encode_json(EVENT, event)
+        for t in self.terminals:
+            if t.covers(event.get("pos")): t.send(msg, EVENT_BACKLOG)
+
+    def broadcast_events(self, events):
+        for event in events: self.broadcast_event(event)
+
+    def broadcast_stats(self, stats):
+        self.stats = stats
+        trend = stats.get("trend") or [None]
+        msg = encode_json(STATS, dict({k: v for k, v in stats.items() if k != "trend"}, sample=trend[-1]))
+        for t in self.terminals: t.send(msg, EVENT_BACKLOG)
+
+    # Simulation thread
+    @property
+    def clients(self):
+        return len(self.terminals)
+
+    def publish(self, tick, xs, ys, hostility, world):
+        if not self.terminals:
+            self.last = None    # Whoever logs in next starts from a keyframe
+            return
+        cur = quantize(xs, ys, hostility)
+        self.seq += 1
+        delta = None
+        if self.last is not None and len(cur) == len(self.last) and tick - self.last_key < self.keyframe_every:
+            delta = encode(DELTA, self.seq, tick, world, with_ids(cur, np.flatnonzero(cur != self.last)))
+        else:
+            self.last_key = tick
+        self.last = cur
+        with self.lock:
+            self.latest = (self.seq, tick, world, cur, delta)
+            if self.scheduled: return
+            self.scheduled = True
+        self.loop.call_soon_threadsafe(self.fanout)
+
+    def publish_event(self, event):
+        self.loop.call_soon_threadsafe(self.broadcast_event, event)
+
+    def publish_events(self, events):
+        # One wake-up of the loop for a tick's worth of events
+        if events: self.loop.call_soon_threadsafe(self.broadcast_events, events)
+
+    def publish_stats(self, stats):
+        # PopulationStats.summary(), trend included
+        self.loop.call_soon_threadsafe(self.broadcast_stats, stats)
+
+    def close(self):
+        if self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+# --- TERMINAL SIDE ---
+# Keeps a local copy of the population, rebuilt from keyframes and patched
+# by deltas, plus the events received since the last drain. After
+# subscribe() it keeps the latest region frame and coarse layer instead.
+# poll() never blocks; a lost admin is retried every few seconds, a refused
+# login is not.
+class StateStreamClient:
+    def __init__(self, username, password, port=STREAM_PORT, host=STREAM_HOST):
+        self.addr = (host, port)
+        self.creds = {"username": username, "password": password}
+        self.sock = None
+        self.buf = bytearray()
+        self.retry_at = 0.0
+        self.denied = None      # Reason the admin refused the login; not retried
+        self.profile = None     # {"username", "role", "clearance"} once logged in
+        self.events = deque(maxlen=256)
+        self.stats = None       # Latest population numbers from the admin
+        self.trend = deque(maxlen=HISTORY)    # Trend samples, oldest first
+        self.region_req = None  # Last subscribe() request, re-sent on reconnect
+        self.reset()
+
+    def reset(self):
+        self.agents = None      # AGENT_DTYPE array indexed by agent id
+        self.region = None      # DELTA_DTYPE records inside the subscribed region
+        self.bounds = None      # (x0, y0, x1, y1) the region frame covers
+        self.coarse = None      # COARSE_DTYPE array shaped (rows, cols)
+        self.coarse_cell = COARSE_CELL
+        self.seq = None
+        self.tick = 0
+        self.world = (0, 0)
+        self.authed = False
+
+    @property
+    def live(self):
+        return self.agents is not None or self.coarse is not None
+
+    def subscribe(self, rect=None, target=None, radius=TRACK_RADIUS):
+        # Only agents in rect, or within radius of agent target, plus the
+        # coarse layer; no arguments goes back to the full feed
+        if rect is not None: req = {"rect": [int(v) for v in rect]}
+        elif target is not None: req = {"target": int(target), "radius": int(radius)}
+        else: req = {}
+        if req == (self.region_req or {}): return
+        self.region_req = req or None
+        self.agents = self.region = self.bounds = self.coarse = None
+        if self.authed: self.send(SUBSCRIBE, req)
+
+    def send(self, kind, data=None):
+        try: self.sock.send(encode_request(kind, data))
+        except OSError: pass
+
+    def connect(self):
+        if self.denied or time.monotonic() < self.retry_at: return False
+        self.retry_at = time.monotonic() + RETRY_SECONDS
+        try:
+            self.sock = socket.create_connection(self.addr, timeout=0.05)
+            self.sock.sendall(encode_request(AUTH, self.creds))
+        except OSError:
+            self.sock = None
+            return False
+        self.sock.setblocking(False)
+        self.buf.clear()
+        return True
+
+    def disconnect(self):
+        if self.sock: self.sock.close()
+        self.sock = None
+        self.reset()
+
+    def poll(self):
+        # Applies everything received so far; True when the agents changed
+        if self.sock is None and not self.connect(): return False
+        closed = False
+        try:
+            while True:
+                data = self.sock.recv(1 << 16)
+                if not data:
+                    closed = True
+                    break
+                self.buf += data
+        except (BlockingIOError, InterruptedError): pass
+        except OSError: closed = True
+
+        # Whatever arrived before the admin hung up is still applied, so a
+        # refusal is read before the connection is dropped
+        changed, pos = False, 0
+        while self.sock and len(self.buf) - pos >= LENGTH.size:
+            (n,) = LENGTH.unpack_from(self.buf, pos)
+            if len(self.buf) - pos - LENGTH.size < n: break
+            start = pos + LENGTH.size
+            changed |= self.apply(bytes(self.buf[start:start + n]))
+            pos = start + n
+        del self.buf[:pos]
+        if closed and self.sock:
+            self.disconnect()
+            return False
+        return changed
+
+    def apply(self, msg):
+        kind, seq, tick, w, h, count = HEADER.unpack_from(msg)
+        body = msg[HEADER.size:]
+        if kind == AUTH_OK:
+            self.authed = True
+            self.profile = json.loads(body)
+            if self.region_req: self.send(SUBSCRIBE, self.region_req)
+        elif kind == AUTH_FAIL:
+            self.denied = json.loads(body).get("reason", "ACCESS DENIED")
+            self.disconnect()
+        elif kind == EVENT:
+            self.events.append(json.loads(body))
+        elif kind == STATS:
+            stats = json.loads(body)
+            if "trend" in stats: self.trend = deque(stats.pop("trend"), maxlen=HISTORY)
+            sample = stats.pop("sample", None)
+            if sample: self.trend.append(sample)
+            self.stats = stats
+        elif kind in (COARSE, REGION):
+            # Ignored when they cross an unsubscribe in flight
+            if not self.region_req: return False
+            if kind == COARSE:
+                cell, cols, rows = COARSE_HEADER.unpack_from(body)
+                self.coarse = np.frombuffer(body, COARSE_DTYPE, count, COARSE_HEADER.size).reshape(rows, cols)
+                self.coarse_cell = cell
+            else:
+                self.bounds = BOUNDS.unpack_from(body)
+                self.region = np.frombuffer(body, DELTA_DTYPE, count, BOUNDS.size)
+        elif self.region_req:
+            return False    # Full-feed frames sent before the subscription landed
+        elif kind == KEYFRAME:
+            self.agents = np.frombuffer(body, AGENT_DTYPE, count).copy()
+        elif kind == DELTA:
+            if self.seq is None: return False    # Waiting for the keyframe already asked for
+            if self.agents is None or seq != (self.seq + 1) & 0xFFFFFFFF:
+                self.request_keyframe()
+                return False
+            rec = np.frombuffer(body, DELTA_DTYPE, count)
+            for f in AGENT_DTYPE.names: self.agents[f][rec["id"]] = rec[f]
+        if kind not in (KEYFRAME, DELTA, COARSE, REGION): return False
+        self.seq, self.tick, self.world = seq, tick, (w, h)
+        return True
+
+    def request_keyframe(self):
+        self.seq = None
+        self.send(RESYNC)
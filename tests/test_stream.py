@@ -0,0 +1,33 @@
+import numpy as np
+
+from stream import DELTA, KEYFRAME, LENGTH, RESYNC, StateStreamClient, encode, quantize, with_ids
+
+WORLD = (200, 100)
+
+def frame(kind, seq, records):
+    return encode(kind, seq, seq, WORLD, records)[LENGTH.size:]
+
+def client():
+    c = StateStreamClient("user", "pw")
+    c.sent = []
+    c.send = lambda kind, data=None: c.sent.append(kind)
+    return c
+
+def test_resync_after_gap():
+    c = client()
+    pop = quantize(np.arange(4) * 10, np.arange(4) * 5, np.zeros(4))
+    assert c.apply(frame(KEYFRAME, 5, pop))
+    assert c.seq == 5
+
+    moved = pop.copy()
+    moved["x"][1] = 99
+    assert not c.apply(frame(DELTA, 7, with_ids(moved, [1])))    # 6 went missing
+    assert c.sent == [RESYNC] and c.seq is None
+
+    assert not c.apply(frame(DELTA, 8, with_ids(moved, [1])))    # Dropped until the keyframe
+    assert c.sent == [RESYNC]
+    assert c.agents["x"][1] == 10
+
+    assert c.apply(frame(KEYFRAME, 9, moved))
+    assert c.apply(frame(DELTA, 10, with_ids(moved, [1])))
+    assert c.seq == 10 and c.agents["x"][1] == 99
@@ -0,0 +1,55 @@
+from collections import OrderedDict
+
+import pygame
+
+DEFAULT_FONT = "Courier"
+TEXT_CACHE_SIZE = 1024   # Rendered strings kept; HUD labels and log lines fit easily
+
+# --- FONT HANDLES ---
+# SysFont scans the system font list on every call, so each (name, size,
+# bold) is looked up once per process and shared by every module.
+_fonts = {}
+
+def get_font(size, bold=False, name=DEFAULT_FONT):
+    key = (name, size, bold)
+    f = _fonts.get(key)
+    if f is None:
+        if not pygame.font.get_init(): pygame.font.init()
+        f = _fonts[key] = pygame.font.SysFont(name, size, bold=bold)
+    return f
+
+# --- RENDERED TEXT CACHE ---
+# Most labels are identical from one frame to the next, so rendered surfaces
+# are kept in an LRU keyed by (font, text, colour, antialias). Returned
+# surfaces are shared: blit them, never draw on them or change their alpha.
+class TextCache:
+    def __init__(self, capacity=TEXT_CACHE_SIZE):
+        self.capacity = capacity
+        self.surfaces = OrderedDict()
+        self.hits = self.misses = 0
+
+    def render(self, text, color, size=14, bold=False, name=DEFAULT_FONT, antialias=True):
+        key = (name, size, bold, text, tuple(color), antialias)
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surf
+        self.misses += 1
+        surf = self.surfaces[key] = get_font(size, bold, name).render(text, antialias, color)
+        if len(self.surfaces) > self.capacity: self.surfaces.popitem(last=False)
+        return surf
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.surfaces),
+                "hit_rate": round(self.hits / total, 4) if total else None}
+
+    def clear(self):
+        self.surfaces.clear()
+        self.hits = self.misses = 0
+
+cache = TextCache()
+
+def render_text(text, color, size=14, bold=False, name=DEFAULT_FONT, antialias=True):
+    return cache.render(text, color, size, bold, name, antialias)
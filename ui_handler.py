@@ -1,9 +1,9 @@
 import pygame
 from settings import Settings
+from text import render_text
 
 class Dashboard:
     def __init__(self):
-        self.font = pygame.font.SysFont("Courier New", 16)
         self.rect = pygame.Rect(Settings.WIDTH - Settings.SIDEBAR_WIDTH, 0, Settings.SIDEBAR_WIDTH, Settings.HEIGHT)
 
     def draw(self, screen, selected_agent):
@@ -11,7 +11,7 @@ class Dashboard:
         pygame.draw.rect(screen, (10, 10, 15), self.rect)
         pygame.draw.line(screen, Settings.COLOR_UI_TEXT, (self.rect.left, 0), (self.rect.left, Settings.HEIGHT), 2)
         
-        header = self.font.render("AEGIS SURVEILLANCE v1.0", True, Settings.COLOR_UI_TEXT)
+        header = render_text("AEGIS SURVEILLANCE v1.0", Settings.COLOR_UI_TEXT, 16, name="Courier New")
         screen.blit(header, (self.rect.left + 10, 20))
 
         if selected_agent:
@@ -26,8 +26,8 @@ class Dashboard:
                 stats = ["ERROR: ENCRYPTED", "TARGET NOT ENROLLED"]
             
             for i, text in enumerate(stats):
-                line = self.font.render(text, True, Settings.COLOR_UI_TEXT)
+                line = render_text(text, Settings.COLOR_UI_TEXT, 16, name="Courier New")
                 screen.blit(line, (self.rect.left + 10, 100 + (i * 30)))
         else:
-            prompt = self.font.render("SELECT TARGET...", True, (100, 100, 100))
+            prompt = render_text("SELECT TARGET...", (100, 100, 100), 16, name="Courier New")
             screen.blit(prompt, (self.rect.left + 10, 100))
\ No newline at end of file
@@ -1,7 +1,15 @@
 import pygame
-import json
 import os
 import time
+import argparse
+
+import numpy as np
+
+from text import render_text
+from stream import StateStreamClient, STREAM_HOST, STREAM_PORT, with_ids
+from journal import journal_dir_for
+from watcher import StateWatcher
+from personnel import PersonnelDirectory
 
 # --- CONFIGURATION ---
 U_WIDTH, U_HEIGHT = 450, 800
@@ -11,98 +19,263 @@ COLOR_CRITICAL = (255, 50, 50)
 COLOR_WHITE = (255, 255, 255) # ADDED THIS LINE TO FIX THE ERROR
 COLOR_TERMINAL_BG = (5, 10, 15)
 COLOR_INPUT_BG = (15, 25, 35)
+LOG_LINES = 10
+STATE_FILES = ("aegis_state.bin", "aegis_state.json")  # Admin default, debug fallback
+DEFAULT_WORLD = (1600, 1200)   # Until the admin reports its world size
+ZOOM = 1.25                    # Zoomed panel pixels per world pixel
+MAP_FILE = "anothermap.png"    # The city image the admin stretches over its world
+MAP_TINT = (50, 80, 70)        # Multiplied into the minimap background so points stand out
 
 class AegisUserApp:
-    def __init__(self):
+    def __init__(self, host=STREAM_HOST, port=STREAM_PORT):
         pygame.init()
         self.screen = pygame.display.set_mode((U_WIDTH, U_HEIGHT))
         pygame.display.set_caption("AEGIS - Field Terminal v1.2")
-        self.font = pygame.font.SysFont("Courier", 14, bold=True)
-        self.large_font = pygame.font.SysFont("Courier", 22, bold=True)
         
         # Auth State
         self.logged_in = False
         self.current_user = None
+        self.verified = False   # Checked against the local roster; otherwise only the admin's word counts
         self.active_field = "username" 
         self.u_text = ""
         self.p_text = ""
         self.error_msg = ""
+        self.personnel = PersonnelDirectory()
         
         # Simulation Data
-        self.state_data = {"recent_events": [], "heat_map": []}
         self.minimap_rect = pygame.Rect(20, 60, 410, 250)
-        self.terminal_rect = pygame.Rect(20, 340, 410, 430)
+        self.zoom_rect = pygame.Rect(20, 320, 410, 180)
+        self.terminal_rect = pygame.Rect(20, 510, 410, 260)
+        self.minimap_bg = self.render_minimap_background()
+        # Region of interest in world pixels, sized to fill the zoomed panel
+        w, h = int(self.zoom_rect.width / ZOOM), int(self.zoom_rect.height / ZOOM)
+        self.roi = pygame.Rect(DEFAULT_WORLD[0] // 2 - w // 2, DEFAULT_WORLD[1] // 2 - h // 2, w, h)
+        self.tracking = None    # Agent id the zoomed panel follows
+        self.stream_addr = (host, port)
+        self.stream = None    # Live feed from the admin, opened at login
+        # Snapshot and event journal are read on a background thread
+        self.watcher = StateWatcher(STATE_FILES, journal_dir_for(STATE_FILES[0]), LOG_LINES).start()
+        self.snapshot = self.watcher.state    # Taken once per frame, so a frame never mixes two snapshots
+        self.clock = pygame.time.Clock()
 
     def check_credentials(self):
-        if os.path.exists("users.json"):
-            with open("users.json", "r") as f:
-                db = json.load(f)
-                for person in db["authorized_personnel"]:
-                    if person["username"] == self.u_text and person["password"] == self.p_text:
-                        self.current_user = person
-                        return True
-        return False
+        self.personnel.refresh()    # Picks up roster edits without a restart
+        self.verified = False
+        if self.personnel.loaded:
+            person = self.personnel.verify(self.u_text, self.p_text)
+            if person: self.current_user = dict(person)
+            self.verified = person is not None
+            return self.verified
+        # Remote terminal without the personnel file: the admin checks the
+        # login, and nothing is shown until it has
+        self.current_user = {"username": self.u_text, "role": "PENDING"}
+        return True
+
+    def open_stream(self):
+        host, port = self.stream_addr
+        self.stream = StateStreamClient(self.u_text, self.p_text, port, host)
+        self.stream.subscribe(rect=(self.roi.left, self.roi.top, self.roi.right, self.roi.bottom))
+
+    def world_size(self):
+        world = self.stream.world if self.stream and self.stream.live else self.snapshot["world"]
+        return tuple(world) if world and world[0] and world[1] else DEFAULT_WORLD
+
+    def click(self, pos, button):
+        # Minimap: move the region of interest there. Zoomed panel: follow the
+        # nearest agent (right click stops following).
+        if self.minimap_rect.collidepoint(pos):
+            ww, wh = self.world_size()
+            self.tracking = None
+            self.roi.center = ((pos[0] - self.minimap_rect.x) / self.minimap_rect.width * ww,
+                               (pos[1] - self.minimap_rect.y) / self.minimap_rect.height * wh)
+        elif self.zoom_rect.collidepoint(pos) and button == 3:
+            # Stay on the sector the agent was last seen in
+            x0, y0, x1, y1 = self.fine_layer()[1]
+            self.tracking = None
+            self.roi.center = ((x0 + x1) // 2, (y0 + y1) // 2)
+        elif self.zoom_rect.collidepoint(pos):
+            a, (x0, y0, x1, y1) = self.fine_layer()
+            if a is None or not len(a): return
+            scale, ox, oy = self.zoom_transform((x0, y0, x1, y1))
+            wx, wy = x0 + (pos[0] - ox) / scale, y0 + (pos[1] - oy) / scale
+            k = int(np.argmin((a["x"] - wx) ** 2 + (a["y"] - wy) ** 2))
+            self.tracking = int(a["id"][k])
+        else:
+            return
+        if self.tracking is not None:
+            self.stream.subscribe(target=self.tracking, radius=self.roi.height // 2)
+        else:
+            self.stream.subscribe(rect=(self.roi.left, self.roi.top, self.roi.right, self.roi.bottom))
+
+    def render_minimap_background(self):
+        # Scaled once; the map spans the whole world whatever its size
+        surf = pygame.Surface(self.minimap_rect.size, 0, 32)   # pixels2d needs whole-word pixels
+        surf.fill((10, 20, 25))
+        if os.path.exists(MAP_FILE):
+            city = pygame.transform.smoothscale(pygame.image.load(MAP_FILE).convert(), self.minimap_rect.size)
+            city.fill(MAP_TINT, special_flags=pygame.BLEND_MULT)
+            surf.blit(city, (0, 0))
+        return surf
+
+    def plot_points(self, surf, a, world):
+        # Every agent as a 2x2 dot, written straight into the pixel buffer
+        w, h = surf.get_size()
+        px = np.minimum((a["x"] * (w / world[0])).astype(np.intp), w - 2)
+        py = np.minimum((a["y"] * (h / world[1])).astype(np.intp), h - 2)
+        # Hostile dots are written last, so they win where dots overlap
+        order = np.argsort(a["h"] > 0.6 * 255, kind="stable")
+        px, py = px[order], py[order]
+        colors = np.where(a["h"][order] > 0.6 * 255, surf.map_rgb(COLOR_CRITICAL), surf.map_rgb(COLOR_TEXT)).astype(np.uint32)
+        pix = pygame.surfarray.pixels2d(surf)
+        for dx, dy in ((0, 0), (1, 0), (0, 1), (1, 1)): pix[px + dx, py + dy] = colors
+        del pix    # Unlocks the surface
+
+    def full_layer(self):
+        # Every agent: the full stream if subscribed to it, else the snapshot
+        return self.stream.agents if self.stream.agents is not None else self.snapshot["agents"]
+
+    def fine_layer(self):
+        # Agents (with ids) for the zoomed panel and the world rect they cover
+        if self.stream.region is not None: return self.stream.region, self.stream.bounds
+        a = self.full_layer()
+        if a is not None and self.tracking is not None and self.tracking < len(a):
+            self.roi.center = (int(a["x"][self.tracking]), int(a["y"][self.tracking]))
+        bounds = (self.roi.left, self.roi.top, self.roi.right, self.roi.bottom)
+        if a is None: return None, bounds
+        inside = (a["x"] >= self.roi.left) & (a["x"] < self.roi.right) & (a["y"] >= self.roi.top) & (a["y"] < self.roi.bottom)
+        return with_ids(a, np.flatnonzero(inside)), bounds
+
+    def zoom_transform(self, bounds):
+        # Uniform scale fitting bounds into the panel, centered
+        x0, y0, x1, y1 = bounds
+        scale = min(self.zoom_rect.width / max(1, x1 - x0), self.zoom_rect.height / max(1, y1 - y0))
+        ox = self.zoom_rect.centerx - (x1 - x0) * scale / 2
+        oy = self.zoom_rect.centery - (y1 - y0) * scale / 2
+        return scale, ox, oy
 
     def draw_login_ui(self):
         self.screen.fill(COLOR_BG)
         
-        title = self.large_font.render("AEGIS SATELLITE LINK", True, COLOR_TEXT)
+        title = render_text("AEGIS SATELLITE LINK", COLOR_TEXT, 22, bold=True)
         self.screen.blit(title, (U_WIDTH//2 - 130, 150))
 
         # Username Field
-        u_label = self.font.render("PERSONNEL ID:", True, COLOR_TEXT)
+        u_label = render_text("PERSONNEL ID:", COLOR_TEXT, bold=True)
         self.screen.blit(u_label, (75, 250))
         u_box = pygame.Rect(75, 275, 300, 40)
         border_u = COLOR_TEXT if self.active_field == "username" else (50, 80, 70)
         pygame.draw.rect(self.screen, COLOR_INPUT_BG, u_box)
         pygame.draw.rect(self.screen, border_u, u_box, 1)
-        self.screen.blit(self.font.render(self.u_text + ("_" if self.active_field == "username" else ""), True, COLOR_WHITE), (85, 287))
+        self.screen.blit(render_text(self.u_text + ("_" if self.active_field == "username" else ""), COLOR_WHITE, bold=True), (85, 287))
 
         # Password Field
-        p_label = self.font.render("ACCESS KEY:", True, COLOR_TEXT)
+        p_label = render_text("ACCESS KEY:", COLOR_TEXT, bold=True)
         self.screen.blit(p_label, (75, 340))
         p_box = pygame.Rect(75, 365, 300, 40)
         border_p = COLOR_TEXT if self.active_field == "password" else (50, 80, 70)
         pygame.draw.rect(self.screen, COLOR_INPUT_BG, p_box)
         pygame.draw.rect(self.screen, border_p, p_box, 1)
         masked_pass = "*" * len(self.p_text)
-        self.screen.blit(self.font.render(masked_pass + ("_" if self.active_field == "password" else ""), True, COLOR_WHITE), (85, 377))
+        self.screen.blit(render_text(masked_pass + ("_" if self.active_field == "password" else ""), COLOR_WHITE, bold=True), (85, 377))
 
         # Error Message
         if self.error_msg:
-            err = self.font.render(self.error_msg, True, COLOR_CRITICAL)
+            err = render_text(self.error_msg, COLOR_CRITICAL, bold=True)
             self.screen.blit(err, (U_WIDTH//2 - err.get_width()//2, 430))
 
     def draw_dashboard(self):
-        if os.path.exists("aegis_state.json"):
-            try:
-                with open("aegis_state.json", "r") as f:
-                    self.state_data = json.load(f)
-            except: pass
+        self.snapshot = self.watcher.state    # Whole snapshot, swapped in by the watcher
+        self.stream.poll()
+        if self.stream.denied:
+            # The admin refused this login
+            self.error_msg = f"AUTHENTICATION FAILURE: {self.stream.denied}"
+            self.logged_in, self.stream = False, None
+            return
+        if self.stream.profile: self.current_user = dict(self.current_user, **self.stream.profile)
 
         self.screen.fill(COLOR_BG)
+        if not self.verified and not self.stream.authed:
+            # No local snapshot or journal data for a login the admin hasn't accepted
+            self.screen.blit(render_text(f"AWAITING AUTHORIZATION: {self.current_user['username']}", COLOR_TEXT, bold=True), (20, 25))
+            return
         status = f"CONNECTED: {self.current_user['username']} ({self.current_user['role']})"
-        self.screen.blit(self.font.render(status, True, COLOR_TEXT), (20, 25))
+        if self.stream.live: status += " LIVE"
+        self.screen.blit(render_text(status, COLOR_TEXT, bold=True), (20, 25))
+        if self.watcher.error and not self.stream.live:
+            self.screen.blit(render_text("SNAPSHOT UNREADABLE, RETRYING", COLOR_CRITICAL, bold=True), (20, 42))
         
-        # Mini-Map
-        pygame.draw.rect(self.screen, (10, 20, 25), self.minimap_rect)
+        # Mini-Map: the coarse layer when subscribed to a sector, else every
+        # agent from the full stream or the last snapshot
+        ww, wh = self.world_size()
+        frame = self.minimap_bg.copy()
+        a = self.full_layer()
+        if self.stream.coarse is not None: self.draw_coarse(frame, ww, wh)
+        elif a is not None: self.plot_points(frame, a, (ww, wh))
+        self.screen.blit(frame, self.minimap_rect.topleft)
         pygame.draw.rect(self.screen, COLOR_TEXT, self.minimap_rect, 1)
-        for h in self.state_data.get("heat_map", []):
-            mx = self.minimap_rect.x + (h[0] / 1600) * self.minimap_rect.width
-            my = self.minimap_rect.y + (h[1] / 1200) * self.minimap_rect.height
-            color = COLOR_CRITICAL if h[2] > 0.6 else COLOR_TEXT
-            pygame.draw.circle(self.screen, color, (int(mx), int(my)), 2)
+        self.draw_zoom(ww, wh)
 
         # Terminal
         pygame.draw.rect(self.screen, COLOR_TERMINAL_BG, self.terminal_rect)
         pygame.draw.rect(self.screen, (40, 40, 50), self.terminal_rect, 1)
-        self.screen.blit(self.font.render("--- INTERVENTION_LOG.sh ---", True, (100, 100, 110)), (30, 350))
-        events = self.state_data.get("recent_events", [])
+        self.screen.blit(render_text("--- INTERVENTION_LOG.sh ---", (100, 100, 110), bold=True), (30, self.terminal_rect.y + 10))
+        # Pushed by the admin while logged in to the stream, else the local journal
+        events = self.stream.events if self.stream.authed and self.stream.events else self.watcher.recent_events(self.snapshot)
         for i, ev in enumerate(reversed(events)):
-            if i > 18: break
+            if i >= LOG_LINES: break
             color = COLOR_CRITICAL if ev["type"] == "MISINFO" else COLOR_TEXT
             msg = f"[{ev['timestamp']}] {ev['message']} @ {ev['pos']}"
-            self.screen.blit(self.font.render(msg, True, color), (35, 380 + i * 22))
+            self.screen.blit(render_text(msg, color, bold=True), (35, self.terminal_rect.y + 40 + i * 22))
+        self.draw_trend()
+
+    def draw_trend(self):
+        # Population trust trend in the log header: from the stream when
+        # logged in to it, else from the snapshot
+        if self.stream.stats: stats, trend = self.stream.stats, list(self.stream.trend)
+        else:
+            stats = self.snapshot.get("stats")
+            if not stats: return
+            trend = stats.get("trend", [])
+        rect = pygame.Rect(self.terminal_rect.right - 130, self.terminal_rect.y + 6, 120, 18)
+        pygame.draw.rect(self.screen, (15, 20, 28), rect)
+        if len(trend) > 1:
+            step = (rect.width - 1) / (len(trend) - 1)
+            points = [(rect.x + k * step, rect.bottom - 1 - s[1] * (rect.height - 1)) for k, s in enumerate(trend)]
+            pygame.draw.lines(self.screen, COLOR_TEXT, False, points)
+        label = f"TRUST {int(stats['trust']*100)}%  RAD {stats['radicalized']}"
+        self.screen.blit(render_text(label, (100, 100, 110), 11), (rect.x, rect.bottom + 2))
+
+    def draw_coarse(self, frame, ww, wh):
+        # One pixel per cell, brightness by head count against the densest
+        # cell, scaled up to the map
+        cells = self.stream.coarse
+        level = np.sqrt(cells["n"].T / max(1, int(cells["n"].max())))[..., None]
+        hot = (cells["h"].T > 0.6 * 255)[..., None]
+        rgb = np.where(hot, COLOR_CRITICAL, COLOR_TEXT) * level
+        surf = pygame.surfarray.make_surface(rgb.astype(np.uint8))
+        cell = self.stream.coarse_cell
+        size = (round(cells.shape[1] * cell / ww * frame.get_width()), round(cells.shape[0] * cell / wh * frame.get_height()))
+        frame.blit(pygame.transform.scale(surf, size), (0, 0), special_flags=pygame.BLEND_ADD)
+
+    def draw_zoom(self, ww, wh):
+        a, bounds = self.fine_layer()
+        x0, y0, x1, y1 = bounds
+        # Region outline on the minimap
+        sx, sy = self.minimap_rect.width / ww, self.minimap_rect.height / wh
+        outline = pygame.Rect(self.minimap_rect.x + x0 * sx, self.minimap_rect.y + y0 * sy, (x1 - x0) * sx, (y1 - y0) * sy)
+        pygame.draw.rect(self.screen, COLOR_WHITE, outline.clip(self.minimap_rect), 1)
+
+        pygame.draw.rect(self.screen, (10, 20, 25), self.zoom_rect)
+        scale, ox, oy = self.zoom_transform(bounds)
+        self.screen.set_clip(self.zoom_rect)
+        if a is not None:
+            for aid, x, y, h in zip(a["id"].tolist(), a["x"].tolist(), a["y"].tolist(), a["h"].tolist()):
+                color = COLOR_WHITE if aid == self.tracking else COLOR_CRITICAL if h > 0.6 * 255 else COLOR_TEXT
+                pygame.draw.circle(self.screen, color, (int(ox + (x - x0) * scale), int(oy + (y - y0) * scale)), 3)
+        self.screen.set_clip(None)
+        pygame.draw.rect(self.screen, COLOR_TEXT, self.zoom_rect, 1)
+        label = f"TRACKING #{self.tracking}" if self.tracking is not None else f"SECTOR {x0},{y0}"
+        self.screen.blit(render_text(label, (100, 100, 110), bold=True), (self.zoom_rect.x + 6, self.zoom_rect.y + 4))
 
     def run(self):
         running = True
@@ -110,6 +283,8 @@ class AegisUserApp:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
+                elif self.logged_in and (self.verified or self.stream.authed) and event.type == pygame.MOUSEBUTTONDOWN:
+                    self.click(event.pos, event.button)
                 
                 if not self.logged_in:
                     if event.type == pygame.KEYDOWN:
@@ -121,6 +296,7 @@ class AegisUserApp:
                         elif event.key == pygame.K_RETURN:
                             if self.check_credentials():
                                 self.logged_in = True
+                                self.open_stream()
                             else:
                                 self.error_msg = "AUTHENTICATION FAILURE: ACCESS DENIED"
                         else:
@@ -133,8 +309,14 @@ class AegisUserApp:
                 self.draw_dashboard()
             
             pygame.display.flip()
-            pygame.time.Clock().tick(30)
+            self.clock.tick(30)
+        self.watcher.stop()
+        if self.stream: self.stream.disconnect()
         pygame.quit()
 
 if __name__ == "__main__":
-    AegisUserApp().run()
+    parser = argparse.ArgumentParser(description="Aegis field terminal")
+    parser.add_argument("--host", default=STREAM_HOST, help="admin node serving the live feed")
+    parser.add_argument("--port", type=int, default=STREAM_PORT)
+    args = parser.parse_args()
+    AegisUserApp(args.host, args.port).run()
@@ -0,0 +1,54 @@
+import numpy as np
+import pygame
+
+from cache import file_digest, cache_path, save_array, load_array
+
+# Matches pygame.mask.from_threshold(surface, (255, 255, 255), (10, 10, 10))
+WHITE_THRESHOLD = 246
+ASSET_VERSION = 1
+
+# --- WALKABILITY GRID ---
+# Built once from the map image; every wall check afterwards is an array read
+# instead of a per-pixel call into pygame.
+class WalkGrid:
+    def __init__(self, cells):
+        self.cells = np.ascontiguousarray(cells, dtype=bool)  # Row-major (y, x)
+        self.height, self.width = self.cells.shape
+
+    @classmethod
+    def from_surface(cls, surface, min_value=WHITE_THRESHOLD):
+        # Walkable where every RGB channel is at least min_value
+        rgb = pygame.surfarray.array3d(surface)
+        return cls((rgb >= min_value).all(axis=2).T)
+
+    def is_walkable(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return bool(self.cells[int(y), int(x)])
+        return False
+
+    def walkable(self, xs, ys):
+        # Batched is_walkable over coordinate arrays; out-of-bounds is a wall
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        ok = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        ok[ok] = self.cells[ys[ok].astype(np.intp), xs[ok].astype(np.intp)]
+        return ok
+
+# --- MAP ASSET CACHE ---
+# Decoding and rescaling a large map PNG dominates startup, so the scaled
+# pixels and the walkability bitmap are stored as raw arrays keyed by the
+# source hash and target size, and memory-mapped on later launches.
+def load_map_asset(source, size, min_value=WHITE_THRESHOLD):
+    # Returns (surface, WalkGrid); the surface is not yet convert()ed
+    digest = file_digest(source, size, min_value, ASSET_VERSION)
+    pix_path = cache_path("mappix", digest, "npy")
+    walk_path = cache_path("mapwalk", digest, "npy")
+    pixels, cells = load_array(pix_path), load_array(walk_path)
+    if pixels is not None and cells is not None:
+        return pygame.image.frombuffer(pixels, size, "RGB").copy(), WalkGrid(cells)
+
+    surface = pygame.transform.scale(pygame.image.load(source), size)
+    walk = WalkGrid.from_surface(surface, min_value)
+    # (y, x, rgb) rows, the layout image.frombuffer reads back
+    save_array(pix_path, np.ascontiguousarray(pygame.surfarray.array3d(surface).transpose(1, 0, 2)))
+    save_array(walk_path, walk.cells)
+    return surface, walk
@@ -0,0 +1,72 @@
+import os
+import threading
+from collections import deque
+
+from journal import JournalReader
+from snapshot import load_state
+
+POLL_SECONDS = 0.25   # stat() interval; the admin only writes every 2 s
+
+# --- STATE WATCHER ---
+# Runs on its own thread so the render loop never touches the disk. The
+# snapshot is only re-read when its mtime or size moves, and only swapped in
+# when its (run, seq) stamp is new; the swap is a single reference
+# assignment, so the render thread sees either the old state or the new one.
+# New journal events are tailed on the same thread.
+class StateWatcher:
+    def __init__(self, paths, journal_root=None, backlog=0, interval=POLL_SECONDS):
+        # paths: snapshot files to watch; whichever was written last is used
+        self.paths = paths
+        self.interval = interval
+        self.state = {"recent_events": [], "agents": None, "world": (0, 0)}
+        self.version = 0          # Bumped on every swap
+        self.error = None         # Last read/parse failure, None once a read succeeds
+        self.stamp = None
+        self.journal = JournalReader(journal_root) if journal_root else None
+        self.events = deque(self.journal.tail(backlog) if self.journal and backlog else (), maxlen=backlog or None)
+        self.lock = threading.Lock()
+        self.stop_flag = threading.Event()
+        self.thread = threading.Thread(target=self.loop, name="state-watcher", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_flag.set()
+        if self.thread.is_alive(): self.thread.join()
+
+    def loop(self):
+        while True:
+            self.check()
+            if self.stop_flag.wait(self.interval): return
+
+    def check(self):
+        stamp = None
+        for path in self.paths:
+            try: st = os.stat(path)
+            except OSError: continue
+            if stamp is None or st.st_mtime_ns > stamp[1]: stamp = (path, st.st_mtime_ns, st.st_size)
+        if stamp is not None and stamp != self.stamp:
+            self.stamp = stamp    # A bad file is retried once it changes again
+            try:
+                data = load_state(stamp[0])
+            except (OSError, ValueError) as e:
+                self.error = f"{type(e).__name__}: {e}"
+            else:
+                self.error = None
+                key = (data.get("run"), data.get("seq"))
+                if key == (None, None) or key != (self.state.get("run"), self.state.get("seq")):
+                    self.state = data
+                    self.version += 1
+        if self.journal:
+            new = self.journal.poll()
+            if new:
+                with self.lock: self.events.extend(new)
+
+    def recent_events(self, state=None):
+        # Journal events when there is a journal, else the window of state
+        # (the current snapshot by default)
+        if self.journal and self.events:
+            with self.lock: return list(self.events)
+        return (state or self.state).get("recent_events", [])